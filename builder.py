@@ -1,19 +1,31 @@
 ﻿import os
 import subprocess
+import shlex # Used to quote the logged command line
 import shutil
 import sys
 import hashlib
+import tempfile
 import threading
-import time
+import queue
+import mmap
+import concurrent.futures
 import struct # Added for struct operations
-from common import build_project
+import re
+import operator
+import signal
+import atexit
 # Import SDK definitions
 from doors_sdk import (
     SDKKPackageHeader,
     SDKKModuleEntry,
     SDKKModuleType,
-    SDKKModuleFlag,
-    SDKK_FORMAT_VERSION
+    SDKK_FORMAT_VERSION,
+    SDKK_TYPE_APPLICATION,
+    SDKK_TYPE_DATA,
+    SDKK_FLAG_EXECUTABLE,
+    module_flag_names,
+    pack_header,
+    pack_entry
 )
 
 # --- Configuration (Defaults - will be overridden by GUI) ---
@@ -45,6 +57,34 @@ LINKER_ARCH_FLAGS = {
     "i686": "i386",
 }
 
+# Optimization flags for the output binary. Every function/object gets its own
+# section so the linker can drop unreferenced code with --gc-sections.
+# At -O2 GCC turns plain zeroing/copy loops into memset/memcpy calls, which do
+# not exist in a -nostdlib link; -fno-tree-loop-distribute-patterns stops that.
+COMPILE_OPTIMIZATION_FLAGS = ["-O2", "-fno-tree-loop-distribute-patterns", "-ffunction-sections", "-fdata-sections"]
+LINK_OPTIMIZATION_FLAGS = ["--gc-sections"]
+
+# Environment variable that overrides the linker executable (e.g., ld.bfd, ld.lld)
+LINKER_OVERRIDE_ENV = "SDKK_LD"
+
+# Per-command timeout for the toolchain (seconds). SDKK_BUILD_TIMEOUT overrides
+# it for build_project; 0 disables the timeout.
+DEFAULT_COMMAND_TIMEOUT = 300 # 5 minutes
+BUILD_TIMEOUT_ENV = "SDKK_BUILD_TIMEOUT"
+
+# Compile cache settings. Bump BUILD_CACHE_VERSION whenever the fixed compiler/
+# linker arguments in compile_to_raw_binary change, so stale binaries are not reused.
+BUILD_CACHE_VERSION = 1
+# The cache lives in the per-user cache directory (SDKK_CACHE_DIR overrides it),
+# never in the build directory, which deploy_to_qemu exports to the guest.
+BUILD_CACHE_DIR_ENV = "SDKK_CACHE_DIR"
+BUILD_CACHE_MAX_ENTRIES = 64 # Least recently used binaries beyond this are deleted
+
+# Chunk size used when streaming input files into the package data section
+DATA_COPY_CHUNK_SIZE = 1 << 20 # 1 MiB
+# Files at least this large are copied in-kernel with os.sendfile (where available)
+SENDFILE_THRESHOLD = 16 << 20 # 16 MiB
+
 # --- Default Linker Script Content ---
 DEFAULT_LINKER_SCRIPT_CONTENT = """\
 /* Default linker script for Doors SDKK */
@@ -101,15 +141,383 @@ SECTIONS
 }
 """
 
+# --- Tool Path Cache ---
+# Resolved {cc, ld, objcopy} paths keyed by (normalized MinGW path, arch).
+# Filled by _find_tool_paths on a successful lookup so the MinGW directory
+# is only scanned once per session for each configuration.
+_TOOL_PATH_CACHE: dict[tuple[str, str], dict] = {}
+
+def _invalidate_tool_cache():
+    """Clears the cached tool paths (e.g., after the MinGW installation changed)."""
+    _TOOL_PATH_CACHE.clear()
+
+# --- Background Hashing Helper ---
+# Number of copy buffers in flight between the packaging loop and the hash thread
+HASH_PIPELINE_DEPTH = 4
+
+class _BackgroundHasher:
+    """
+    Feeds data-section chunks to a hashlib object on a worker thread, and
+    optionally to a second, per-file hashlib object given with each chunk.
+
+    hashlib releases the GIL while hashing large buffers, so SHA-256 of one
+    chunk overlaps with the disk write of the same chunk and the read of the
+    next one. Chunks are handed over in a small pool of reusable buffers: a
+    buffer only returns to the pool once it has been hashed, so the producer
+    can never overwrite data the worker has not consumed yet.
+    """
+    def __init__(self, hasher, buffer_size: int, depth: int = HASH_PIPELINE_DEPTH):
+        self._hasher = hasher
+        self._free_buffers = queue.Queue()
+        for _ in range(depth):
+            self._free_buffers.put(bytearray(buffer_size))
+        self._pending = queue.Queue(maxsize=depth)
+        self._error = None
+        self._thread = threading.Thread(target=self._worker, name="sdkk-hash", daemon=True)
+        self._thread.start()
+
+    def _worker(self):
+        while True:
+            item = self._pending.get()
+            if item is None: # Sentinel: no more chunks
+                return
+            buffer, length, pooled, file_hasher = item
+            if self._error is None:
+                try:
+                    # Released on exit: an mmap cannot be closed while a view of it exists
+                    with memoryview(buffer)[:length] as chunk:
+                        self._hasher.update(chunk)
+                        if file_hasher is not None:
+                            file_hasher.update(chunk)
+                except Exception as e:
+                    # Keep draining so the producer never blocks on the pool
+                    self._error = e
+            if pooled:
+                self._free_buffers.put(buffer)
+            self._pending.task_done()
+
+    def acquire_buffer(self) -> bytearray:
+        """Returns a buffer that is safe to fill (blocks until one has been hashed)."""
+        return self._free_buffers.get()
+
+    def release_buffer(self, buffer: bytearray):
+        """Returns an unused buffer (e.g., at EOF) to the pool without hashing it."""
+        self._free_buffers.put(buffer)
+
+    def submit(self, buffer: bytearray, length: int, file_hasher=None):
+        """
+        Queues buffer[:length] for hashing (also into file_hasher, if given).
+        The buffer must not be modified afterwards.
+        """
+        self._pending.put((buffer, length, True, file_hasher))
+
+    def submit_external(self, data, length: int, file_hasher=None):
+        """Queues a caller-owned buffer (e.g., an mmap); it must stay valid until wait()."""
+        self._pending.put((data, length, False, file_hasher))
+
+    def wait(self):
+        """Blocks until every queued chunk has been hashed."""
+        self._pending.join()
+
+    def close(self):
+        """Waits for all queued chunks to be hashed and re-raises any hashing error."""
+        self._pending.put(None) # The sentinel is never task_done()'d; join() below is enough
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+# --- Output Preallocation Helper ---
+def _preallocate_file(f, size: int, report_progress=None):
+    """
+    Extends the freshly created file 'f' to 'size' bytes before it is written.
+    Uses posix_fallocate (real block allocation) where available and falls back
+    to truncate (sparse extension). Failures are not fatal - the writes simply
+    grow the file as before.
+    """
+    if size <= 0:
+        return
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+            return
+        except OSError:
+            pass # e.g. EOPNOTSUPP on filesystems without fallocate support
+    try:
+        f.truncate(size)
+    except OSError as e:
+        if report_progress:
+            report_progress(f"Warning: Could not preallocate {size} bytes for the package: {e}")
+
+# --- Thread Pool Limits ---
+# Upper bound on threads used to check that additional files exist
+MAX_STAT_WORKERS = 8
+
+# --- In-Kernel File Copy Helper ---
+def _sendfile_copy(out_file, in_file, count: int) -> int:
+    """
+    Copies up to 'count' bytes from in_file (at its start) to out_file (at its
+    current position) with os.sendfile, bypassing user-space buffers.
+    Returns the number of bytes copied; on an unsupported platform/filesystem
+    this may be less than 'count' and the caller must copy the rest itself.
+    Both file positions are left just after the copied data.
+    """
+    out_file.flush() # Push buffered bytes to the fd before writing to it directly
+    out_fd = out_file.fileno()
+    in_fd = in_file.fileno()
+    out_start = out_file.tell()
+    copied = 0
+    try:
+        while copied < count:
+            sent = os.sendfile(out_fd, in_fd, copied, count - copied)
+            if sent == 0: # Source is shorter than expected
+                break
+            copied += sent
+    except OSError:
+        # e.g. EINVAL/ENOTSOCK where sendfile cannot target regular files
+        pass
+    # Re-sync the Python-level positions with what actually went through the fds
+    out_file.seek(out_start + copied)
+    in_file.seek(copied)
+    return copied
+
+# --- Temporary Directory Cleanup Helper ---
+# unlinkat/rmdirat-style removal relative to an open directory fd (POSIX)
+_RMTREE_USE_FD = (os.unlink in os.supports_dir_fd and os.rmdir in os.supports_dir_fd
+                  and os.open in os.supports_dir_fd and os.scandir in os.supports_fd)
+
+def _rmtree_contents_fd(dir_fd: int):
+    """Removes everything inside the directory open as 'dir_fd', by name relative to it."""
+    with os.scandir(dir_fd) as it:
+        entries = list(it) # Finish listing before removing anything
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            child_fd = os.open(entry.name, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW, dir_fd=dir_fd)
+            try:
+                _rmtree_contents_fd(child_fd)
+            finally:
+                os.close(child_fd)
+            os.rmdir(entry.name, dir_fd=dir_fd)
+        else:
+            os.unlink(entry.name, dir_fd=dir_fd)
+
+def _rmtree_contents_path(path: str):
+    """Path-based fallback of _rmtree_contents_fd (e.g. on Windows)."""
+    with os.scandir(path) as it:
+        entries = list(it)
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            _rmtree_contents_path(entry.path)
+            os.rmdir(entry.path)
+        else:
+            os.unlink(entry.path)
+
+def _scandir_rmtree(path: str):
+    """
+    Removes the directory tree at 'path' in a single bottom-up os.scandir walk.
+    The DirEntry type information avoids the extra stat calls of shutil.rmtree,
+    and on POSIX entries are removed relative to an open directory fd
+    (unlinkat), so the kernel does not resolve the full path for every file.
+    Raises OSError if the tree could not be removed.
+    """
+    if _RMTREE_USE_FD:
+        dir_fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            _rmtree_contents_fd(dir_fd)
+        finally:
+            os.close(dir_fd)
+    else:
+        _rmtree_contents_path(path)
+    os.rmdir(path)
+
+# --- Build Workspace Pool ---
+# Free temporary binary directories kept alive between build_project calls.
+# They live in the system temp directory, never in the build directory (which
+# deploy_to_qemu exports to the guest), so one left behind by a killed process
+# is only temp clutter. A directory is taken out of the pool while a build
+# uses it, so concurrent builds never share one.
+_WORKSPACE_POOL: list[str] = []
+_WORKSPACE_POOL_LOCK = threading.Lock()
+
+def _acquire_workspace() -> str:
+    """Returns a free pooled directory, creating one with mkdtemp if needed."""
+    with _WORKSPACE_POOL_LOCK:
+        while _WORKSPACE_POOL:
+            workspace = _WORKSPACE_POOL.pop()
+            if os.path.isdir(workspace): # Skip directories removed behind our back
+                return workspace
+    # mkdtemp picks a unique name and creates it atomically (O_EXCL semantics)
+    return tempfile.mkdtemp(prefix="sdkk_bin_")
+
+def _release_workspace(workspace: str):
+    """Returns a directory obtained from _acquire_workspace to the pool."""
+    with _WORKSPACE_POOL_LOCK:
+        _WORKSPACE_POOL.append(workspace)
+
+@atexit.register
+def _cleanup_workspace_pool():
+    """Removes all pooled directories when the process exits."""
+    with _WORKSPACE_POOL_LOCK:
+        for workspace in _WORKSPACE_POOL:
+            try: _scandir_rmtree(workspace)
+            except OSError: pass
+        _WORKSPACE_POOL.clear()
+
+# --- Compile Cache Helpers ---
+_LOCAL_INCLUDE_RE = re.compile(r'^\s*#\s*include\s*"([^"]+)"', re.MULTILINE)
+
+def _compute_compile_cache_key(source_file: str, linker_script_path: str, arch: str, entry: str,
+                               tool_paths: list[str], source_bytes: bytes = None) -> str:
+    """
+    Returns a hex SHA-256 identifying one compile_to_raw_binary invocation.
+    Covers the source, every local header it (transitively) includes with
+    #include "...", the linker script, the target settings, the toolchain
+    executables and the optimization flags. Raises OSError if the source or
+    linker script cannot be read. source_bytes, when given, is hashed instead of
+    re-reading source_file; it must hold the file's current text, but may differ
+    from it in newline translation (at worst that costs one cache miss).
+    """
+    hasher = hashlib.sha256()
+    def add_field(value: bytes):
+        # Length-prefix every field so adjacent fields can never run together
+        hasher.update(len(value).to_bytes(8, "little"))
+        hasher.update(value)
+
+    add_field(str(BUILD_CACHE_VERSION).encode())
+    add_field(arch.encode())
+    add_field(entry.encode())
+    for tool_path in tool_paths:
+        add_field(os.path.normpath(tool_path).encode())
+    add_field(repr(COMPILE_OPTIMIZATION_FLAGS).encode())
+    add_field(repr(LINK_OPTIMIZATION_FLAGS).encode())
+    with open(linker_script_path, "rb") as f:
+        add_field(f.read())
+
+    # Hash the source and its local headers (missing headers are skipped -
+    # the compiler will report them anyway when the key misses).
+    source_path = os.path.abspath(source_file)
+    pending = [source_path]
+    visited = set()
+    while pending:
+        path = pending.pop()
+        if path in visited:
+            continue
+        visited.add(path)
+        try:
+            if path == source_path and source_bytes is not None:
+                content = source_bytes
+            else:
+                with open(path, "rb") as f:
+                    content = f.read()
+        except OSError:
+            if path == source_path: # The source file itself must be readable
+                raise
+            continue
+        add_field(path.encode("utf-8", "surrogateescape"))
+        add_field(content)
+        include_dir = os.path.dirname(path)
+        for include in _LOCAL_INCLUDE_RE.findall(content.decode("utf-8", "replace")):
+            pending.append(os.path.normpath(os.path.join(include_dir, include)))
+
+    return hasher.hexdigest()
+
+def _default_compile_cache_dir() -> str:
+    """Returns the directory build_project keeps compiled binaries in."""
+    override = os.environ.get(BUILD_CACHE_DIR_ENV, "").strip()
+    if override:
+        return override
+    if sys.platform.startswith('win'):
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    elif sys.platform == "darwin":
+        base = os.path.join(os.path.expanduser("~"), "Library", "Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "sdkk_builder", "compile")
+
+def _prune_compile_cache(cache_dir: str, max_entries: int = BUILD_CACHE_MAX_ENTRIES):
+    """
+    Deletes the least recently used binaries in cache_dir beyond max_entries.
+    Hits refresh a binary's mtime, so mtime order is use order. Raises OSError
+    if cache_dir cannot be listed.
+    """
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".bin") and entry.is_file():
+                try:
+                    entries.append((entry.stat().st_mtime_ns, entry.path))
+                except OSError:
+                    continue
+    if len(entries) <= max_entries:
+        return
+    entries.sort()
+    for _, path in entries[:len(entries) - max_entries]:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass # In use or already gone; the next prune retries
+
+# --- Header Checksum Helper ---
+def _compute_header_checksum(header_bytes) -> int:
+    """
+    Returns the SDKK header checksum: the sum of all header bytes preceding
+    the checksum field, truncated to 32 bits.
+    """
+    # The kernel verifies exactly this byte sum, so it cannot be swapped for
+    # adler32/crc32 without a format version bump. sum() over a bytes object
+    # already runs as a single C loop (~2 us for a 508-byte header); views are
+    # materialized once because iterating a memoryview is slower than bytes.
+    if not isinstance(header_bytes, bytes):
+        header_bytes = bytes(header_bytes)
+    return sum(header_bytes) & 0xFFFFFFFF
+
 # --- SDKK Package Structure Constants (Derived from doors_sdk.py) ---
+# The header and entries are packed with doors_sdk.pack_header/pack_entry.
+# The trailing header_checksum field, patched in place after the checksum is computed
+_HEADER_CHECKSUM_STRUCT = struct.Struct("<I")
+_HEADER_CHECKSUM_OFFSET = SDKKPackageHeader.SIZE - _HEADER_CHECKSUM_STRUCT.size
 # These are now dynamically derived from the SDKK structures
 # SD_KIT_HEADER_SIZE = 512 # Removed, use SDKKPackageHeader.SIZE
 # SD_KIT_ENTRY_SIZE = 256  # Removed, use SDKKModuleEntry.SIZE
 
 # --- Helper Function for Running Commands ---
-def _run_command(cmd: list[str], cwd: str = None, progress_callback=None) -> tuple[bool, str]:
-    """Helper function to run a command and capture output."""
-    cmd_str = " ".join(subprocess.list2cmdline(cmd).split())
+def _resolve_command_timeout(timeout=None):
+    """
+    Returns the effective per-command timeout in seconds, or None for no limit.
+    An explicit 'timeout' wins; otherwise SDKK_BUILD_TIMEOUT is used, then the
+    default. Zero or negative values mean "no timeout".
+    """
+    if timeout is None:
+        env_value = os.environ.get(BUILD_TIMEOUT_ENV, "").strip()
+        try:
+            timeout = float(env_value) if env_value else DEFAULT_COMMAND_TIMEOUT
+        except ValueError:
+            timeout = DEFAULT_COMMAND_TIMEOUT # Ignore malformed values
+    return timeout if timeout > 0 else None
+
+def _kill_process_tree(process: subprocess.Popen):
+    """Kills a process started by _run_command together with any children it spawned."""
+    try:
+        if sys.platform.startswith('win'):
+            # taskkill /T walks the child tree (gcc -> cc1, as, ...)
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            # The command runs in its own session, so its pid is the group id
+            os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    if process.poll() is None:
+        process.kill() # Fallback: at least the direct child
+
+def _run_command(cmd: list[str], cwd: str = None, progress_callback=None,
+                 timeout=DEFAULT_COMMAND_TIMEOUT) -> tuple[bool, str]:
+    """
+    Helper function to run a command and capture output.
+    timeout is in seconds; 0 or None waits indefinitely. On timeout the whole
+    process group (the tool and its children) is killed.
+    """
+    if not timeout or timeout <= 0:
+        timeout = None
     # Use a unique ID for each _run_command call instance for better tracking
     # Ensure id(cmd) is converted to string before slicing
     call_id = f"{threading.current_thread().name}_{str(id(cmd))[-4:]}" # Use last 4 digits
@@ -120,40 +528,95 @@ def _run_command(cmd: list[str], cwd: str = None, progress_callback=None) -> tup
         if progress_callback:
             progress_callback(full_message) # Send to GUI status bar/log
 
-    report(f"Executing: {cmd_str}")
+    if progress_callback:
+        # Only built for the log; shlex.join quotes arguments with spaces unambiguously
+        report(f"Executing: {shlex.join(cmd)}")
 
-    try:
-        # Use capture_output=True, text=True
-        # check=True will raise CalledProcessError on non-zero exit code
-        # Added timeout to prevent infinite hangs, adjust as needed
-        result = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, check=True, timeout=300) # 5 minute timeout
-        report("Command completed successfully.")
-        # Combine stdout and stderr for successful commands if needed, or just return stdout
-        output = result.stdout.strip()
-        if result.stderr.strip():
-             output += "\nStderr:\n" + result.stderr.strip()
-        return True, output
+    # Lines are forwarded to progress_callback as soon as the tool prints them
+    # and are also collected for the returned output/error message.
+    stdout_lines = []
+    stderr_lines = []
 
+    def pump(stream, label, sink):
+        try:
+            for line in stream:
+                line = line.rstrip("\r\n")
+                sink.append(line)
+                report(f"{label}: {line}")
+        except Exception as e:
+            # Keep draining (without reporting) so the tool never dies writing to a closed pipe
+            sink.append(f"[Error reading {label}: {e}]")
+            for line in stream:
+                sink.append(line.rstrip("\r\n"))
+        finally:
+            stream.close()
+
+    # Start the tool in its own process group so a timeout can kill all of it.
+    # Output is decoded leniently: diagnostics may be in the console codepage or
+    # quote non-UTF-8 source lines, and one bad byte must not stop the readers.
+    if sys.platform.startswith('win'):
+        group_kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        group_kwargs = {"start_new_session": True}
+
+    try:
+        process = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   text=True, encoding="utf-8", errors="replace", bufsize=1,
+                                   **group_kwargs)
     except FileNotFoundError:
         error_message = f"Error: The executable '{cmd[0]}' was not found. Make sure the MinGW Bin Path is correct and contains the necessary tools."
         report(error_message)
         return False, error_message
-    except subprocess.CalledProcessError as e:
-        report(f"Command failed with return code {e.returncode}.")
-        stdout_content = e.stdout.strip() if e.stdout else "EMPTY STDOUT"
-        stderr_content = e.stderr.strip() if e.stderr else "EMPTY STDERR"
-        error_output = f"Stdout:\n{stdout_content}\nStderr:\n{stderr_content}"
-        report(error_output)
-        return False, error_output
+    except Exception as e:
+        error_message = f"An unexpected error occurred while running command: {e}"
+        report(error_message)
+        return False, error_message
+
+    # One reader per pipe so neither can fill up and block the child process
+    readers = [
+        threading.Thread(target=pump, args=(process.stdout, "stdout", stdout_lines), daemon=True),
+        threading.Thread(target=pump, args=(process.stderr, "stderr", stderr_lines), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    try:
+        # Timeout prevents infinite hangs (configurable, see DEFAULT_COMMAND_TIMEOUT)
+        returncode = process.wait(timeout=timeout)
     except subprocess.TimeoutExpired:
-        error_message = f"Error: Command timed out after 300 seconds."
+        _kill_process_tree(process)
+        process.wait()
+        for reader in readers:
+            reader.join()
+        error_message = f"Error: Command timed out after {timeout:g} seconds."
         report(error_message)
         return False, error_message
     except Exception as e:
+        _kill_process_tree(process)
+        process.wait()
         error_message = f"An unexpected error occurred while running command: {e}"
         report(error_message)
         return False, error_message
 
+    # The pipes reach EOF once the process exits; wait for the last lines
+    for reader in readers:
+        reader.join()
+    stdout_content = "\n".join(stdout_lines).strip()
+    stderr_content = "\n".join(stderr_lines).strip()
+
+    if returncode != 0:
+        report(f"Command failed with return code {returncode}.")
+        error_output = f"Stdout:\n{stdout_content or 'EMPTY STDOUT'}\nStderr:\n{stderr_content or 'EMPTY STDERR'}"
+        report(error_output)
+        return False, error_output
+
+    report("Command completed successfully.")
+    # Combine stdout and stderr for successful commands if needed, or just return stdout
+    output = stdout_content
+    if stderr_content:
+         output += "\nStderr:\n" + stderr_content
+    return True, output
+
 
 # --- Helper to find tool paths ---
 def _find_tool_paths(mingw_path: str, arch: str, progress_callback=None) -> tuple[bool, dict, str]:
@@ -163,6 +626,13 @@ def _find_tool_paths(mingw_path: str, arch: str, progress_callback=None) -> tupl
         if progress_callback:
             progress_callback(f"Tool Find: {message}")
 
+    mingw_bin_path = os.path.normpath(mingw_path) # Normalize path
+    cache_key = (mingw_bin_path, arch)
+    cached_paths = _TOOL_PATH_CACHE.get(cache_key)
+    if cached_paths is not None:
+        report(f"Using cached tools for architecture '{arch}' in '{mingw_bin_path}'.")
+        return True, dict(cached_paths), ""
+
     report(f"Searching for tools for architecture '{arch}' in '{mingw_path}'...")
     tool_paths = {}
     tools_needed = ["cc", "ld", "objcopy"]
@@ -173,9 +643,6 @@ def _find_tool_paths(mingw_path: str, arch: str, progress_callback=None) -> tupl
          report(error_msg)
          return False, {}, error_msg
 
-    is_windows = sys.platform.startswith('win')
-    mingw_bin_path = os.path.normpath(mingw_path) # Normalize path
-
     if not os.path.isdir(mingw_bin_path):
          error_msg = f"MinGW Bin Path '{mingw_bin_path}' is not a valid directory."
          report(error_msg)
@@ -184,18 +651,16 @@ def _find_tool_paths(mingw_path: str, arch: str, progress_callback=None) -> tupl
     for tool_key in tools_needed:
         prefixed_name = tool_names_for_arch[f"{tool_key}_prefixed"]
         unprefixed_name = tool_names_for_arch[f"{tool_key}_unprefixed"]
-
-        found_path = None
         potential_names = [prefixed_name, unprefixed_name]
-        if is_windows:
-             potential_names.extend([f"{name}.exe" for name in potential_names])
 
-        report(f"  Looking for '{tool_key}' (e.g., {', '.join(potential_names[:2])}...)")
+        report(f"  Looking for '{tool_key}' (e.g., {', '.join(potential_names)})")
 
+        # shutil.which searches only the MinGW directory here, checks that the
+        # file is executable and applies PATHEXT (.exe, .cmd, ...) on Windows.
+        found_path = None
         for name in potential_names:
-            path_to_check = os.path.join(mingw_bin_path, name)
-            if os.path.exists(path_to_check):
-                found_path = path_to_check
+            found_path = shutil.which(name, path=mingw_bin_path)
+            if found_path:
                 break # Found the tool
 
         if found_path:
@@ -211,15 +676,26 @@ def _find_tool_paths(mingw_path: str, arch: str, progress_callback=None) -> tupl
             return False, {}, error_msg
 
     report("All required tools found.")
+    _TOOL_PATH_CACHE[cache_key] = dict(tool_paths)
     return True, tool_paths, ""
 
 
 # --- Compile/Link/Objcopy Function (Produces raw binary) ---
 def compile_to_raw_binary(source_file: str, output_binary_path: str, arch: str = "x86_64", entry: str = "_start",
-                          mingw_path: str = "C:/msys64/mingw64/bin", progress_callback=None) -> tuple[bool, str]:
+                          mingw_path: str = "C:/msys64/mingw64/bin", progress_callback=None,
+                          cache_dir: str = None, use_cache: bool = True,
+                          timeout=DEFAULT_COMMAND_TIMEOUT, source_bytes: bytes = None) -> tuple[bool, str]:
     """
     Compiles, links, and converts a source file to a raw binary using MinGW tools.
     This raw binary is intended to be *part* of the final SDKK package.
+
+    Unless use_cache is False, the gcc/ld/objcopy pipeline is skipped when the
+    inputs are unchanged (see _compute_compile_cache_key). With cache_dir the
+    binaries are kept there by key, which also works for temporary output
+    paths; without it a '<output>.cachekey' file next to the output is used.
+    timeout applies to each tool invocation (seconds; 0/None = no limit).
+    source_bytes is the current content of source_file if the caller already
+    has it in memory; it saves re-reading the file for the cache key.
     """
     def report_progress(message):
         """Helper to send messages via callback and print."""
@@ -236,23 +712,16 @@ def compile_to_raw_binary(source_file: str, output_binary_path: str, arch: str =
 
     # --- Create Temp Directories ---
     output_dir = os.path.dirname(output_binary_path)
-    temp_dir_base = os.path.join(output_dir, "temp_build_bin")
-    temp_dir = None
-    for i in range(100): # Try a few times to find a unique name
-        temp_dir_candidate = f"{temp_dir_base}_{int(time.time())}_{i}"
-        if not os.path.exists(temp_dir_candidate):
-            temp_dir = temp_dir_candidate
-            break
-        time.sleep(0.01) # Small delay before retrying
-
-    if temp_dir is None:
-         error_msg = f"Error: Could not create a unique temporary directory base on '{temp_dir_base}'."
-         report_progress(error_msg)
-         return False, error_msg
+    try:
+        # mkdtemp picks a unique name and creates it atomically (O_EXCL semantics)
+        temp_dir = tempfile.mkdtemp(prefix="temp_build_bin_", dir=output_dir or None)
+    except OSError as e:
+        error_msg = f"Error: Could not create a temporary build directory in '{output_dir}': {e}"
+        report_progress(error_msg)
+        return False, error_msg
 
-    report_progress(f"Creating temporary build directory: {temp_dir}")
+    report_progress(f"Created temporary build directory: {temp_dir}")
     try:
-        os.makedirs(temp_dir, exist_ok=True)
         # Verify temp directories can be written to
         test_write_path = os.path.join(temp_dir, "write_test.tmp")
         with open(test_write_path, 'w') as f:
@@ -279,7 +748,7 @@ def compile_to_raw_binary(source_file: str, output_binary_path: str, arch: str =
             report_progress(error_msg)
             # Clean up temp dir before returning
             if os.path.exists(temp_dir):
-                try: shutil.rmtree(temp_dir)
+                try: _scandir_rmtree(temp_dir)
                 except OSError: pass
             return False, error_msg
     else:
@@ -291,19 +760,62 @@ def compile_to_raw_binary(source_file: str, output_binary_path: str, arch: str =
     if not success:
         # Clean up temp dir before returning
         if os.path.exists(temp_dir):
-            try: shutil.rmtree(temp_dir)
+            try: _scandir_rmtree(temp_dir)
             except OSError: pass
         return False, error_msg
 
     cc = tool_paths["cc"]
     ld = tool_paths["ld"]
+    ld_override = os.environ.get(LINKER_OVERRIDE_ENV)
+    if ld_override:
+        report_progress(f"Using linker from {LINKER_OVERRIDE_ENV}: {ld_override}")
+        ld = ld_override
     objcopy = tool_paths["objcopy"]
 
+    # --- Compile Cache Lookup ---
+    cache_key = None
+    cached_binary_path = None
+    if use_cache:
+        try:
+            cache_key = _compute_compile_cache_key(source_file, linker_script_path, arch, entry, [cc, ld, objcopy],
+                                                   source_bytes=source_bytes)
+        except OSError as e:
+            report_progress(f"Warning: Could not compute compile cache key, rebuilding: {e}")
+    if cache_key:
+        cache_hit = False
+        if cache_dir:
+            cached_binary_path = os.path.join(cache_dir, cache_key + ".bin")
+            if os.path.isfile(cached_binary_path):
+                try:
+                    shutil.copyfile(cached_binary_path, output_binary_path)
+                    os.utime(cached_binary_path) # Mark as recently used for _prune_compile_cache
+                    cache_hit = True
+                except OSError as e:
+                    report_progress(f"Warning: Could not reuse cached binary '{cached_binary_path}': {e}")
+        elif os.path.isfile(output_binary_path):
+            try:
+                with open(output_binary_path + ".cachekey", "r") as f:
+                    cache_hit = f.read().strip() == cache_key
+            except OSError:
+                pass
+        if cache_hit:
+            report_progress(f"Sources unchanged (cache key {cache_key[:12]}), skipping compile/link/objcopy.")
+            if os.path.exists(temp_dir):
+                try: _scandir_rmtree(temp_dir)
+                except OSError: pass
+            return True, f"Raw binary up to date (cached): {output_binary_path}"
+
     # Determine intermediate object file name and linked ELF name
     source_base_name = os.path.basename(source_file)
     obj_file = os.path.join(temp_dir, source_base_name.rsplit('.', 1)[0] + ".o")
     linked_elf_output = os.path.join(temp_dir, source_base_name.rsplit('.', 1)[0] + ".elf") # Use source base name for ELF too
 
+    # Normalize every path passed to the tools once
+    source_file_arg = os.path.normpath(source_file)
+    obj_file_arg = os.path.normpath(obj_file)
+    linked_elf_arg = os.path.normpath(linked_elf_output)
+    linker_script_arg = os.path.normpath(linker_script_path)
+    output_binary_arg = os.path.normpath(output_binary_path)
 
     try:
         # 1. Compile Source File
@@ -315,13 +827,14 @@ def compile_to_raw_binary(source_file: str, output_binary_path: str, arch: str =
             "-fno-pie",       # Position Independent Executable (PIE) is not needed/wanted
             "-nostdlib",      # Do not link the standard library
             "-Wall", "-Wextra", # Enable common warnings
+            *COMPILE_OPTIMIZATION_FLAGS, # Optimize and split sections for --gc-sections
             "-c",             # Compile only, do not link
-            os.path.normpath(source_file), # Normalize source file path
+            source_file_arg, # Normalized source file path
             "-o",
-            os.path.normpath(obj_file) # Normalize output object file path
+            obj_file_arg # Normalized output object file path
         ]
         # Run compile command from the temp directory
-        success, message = _run_command(cmd_compile, cwd=temp_dir, progress_callback=report_progress)
+        success, message = _run_command(cmd_compile, cwd=temp_dir, progress_callback=report_progress, timeout=timeout)
         if not success:
             return False, f"Compilation failed:\n{message}"
         report_progress("Compilation successful.")
@@ -332,20 +845,21 @@ def compile_to_raw_binary(source_file: str, output_binary_path: str, arch: str =
         if not linker_arch_flag:
              # Clean up temp dir before returning
              if os.path.exists(temp_dir):
-                 try: shutil.rmtree(temp_dir)
+                 try: _scandir_rmtree(temp_dir)
                  except OSError: pass
              return False, f"Internal Error: No linker architecture flag defined for '{arch}'"
 
         cmd_link = [
             ld,
-            "-T", os.path.normpath(linker_script_path), # Use the linker script (normalized)
+            "-T", linker_script_arg, # Use the linker script (normalized)
             "-m", linker_arch_flag,   # Specify target architecture for linker
-            "-e", entry,              # Set entry point symbol
-            "-o", os.path.normpath(linked_elf_output),  # Output ELF file (normalized)
-            os.path.normpath(obj_file)                  # Input object file (normalized)
+            "-e", entry,              # Set entry point symbol (also the --gc-sections root)
+            *LINK_OPTIMIZATION_FLAGS, # Discard unreferenced sections
+            "-o", linked_elf_arg,  # Output ELF file (normalized)
+            obj_file_arg                  # Input object file (normalized)
         ]
         # Run link command from the temp directory
-        success, message = _run_command(cmd_link, cwd=temp_dir, progress_callback=report_progress)
+        success, message = _run_command(cmd_link, cwd=temp_dir, progress_callback=report_progress, timeout=timeout)
         if not success:
             return False, f"Linking failed:\n{message}"
         report_progress("Linking successful.")
@@ -355,16 +869,33 @@ def compile_to_raw_binary(source_file: str, output_binary_path: str, arch: str =
         cmd_objcopy = [
             objcopy,
             "-O", "binary",       # Output format is raw binary
-            os.path.normpath(linked_elf_output),    # Input ELF file (normalized)
-            os.path.normpath(output_binary_path)    # Output raw binary file (normalized)
+            linked_elf_arg,    # Input ELF file (normalized)
+            output_binary_arg    # Output raw binary file (normalized)
         ]
         # Run objcopy command from the temp directory
-        success, message = _run_command(cmd_objcopy, cwd=temp_dir, progress_callback=report_progress)
+        success, message = _run_command(cmd_objcopy, cwd=temp_dir, progress_callback=report_progress, timeout=timeout)
         if not success:
             return False, f"Objcopy failed:\n{message}"
         report_progress("Objcopy successful.")
 
         report_progress(f"Raw binary created: {os.path.basename(output_binary_path)}")
+
+        # --- Compile Cache Store (failures only cost a rebuild next time) ---
+        if cache_key:
+            try:
+                if cached_binary_path:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    # Copy under a temp name and rename so readers never see a partial file
+                    partial_path = f"{cached_binary_path}.{os.getpid()}.tmp"
+                    shutil.copyfile(output_binary_path, partial_path)
+                    os.replace(partial_path, cached_binary_path)
+                    _prune_compile_cache(cache_dir)
+                else:
+                    with open(output_binary_path + ".cachekey", "w") as f:
+                        f.write(cache_key)
+            except OSError as e:
+                report_progress(f"Warning: Could not update compile cache: {e}")
+
         return True, f"Raw binary creation successful: {output_binary_path}"
 
     except Exception as e:
@@ -376,7 +907,7 @@ def compile_to_raw_binary(source_file: str, output_binary_path: str, arch: str =
         report_progress(f"Cleaning up temporary directory: {temp_dir}")
         if os.path.exists(temp_dir):
             try:
-                shutil.rmtree(temp_dir)
+                _scandir_rmtree(temp_dir)
                 report_progress("Temporary directory cleaned up.")
             except OSError as e:
                 report_progress(f"Warning: Failed to clean up temporary directory {temp_dir}: {e}")
@@ -385,17 +916,26 @@ def compile_to_raw_binary(source_file: str, output_binary_path: str, arch: str =
 # --- SDKK Package Building Function ---
 def build_sdkk_package(output_sdkk_path: str, package_name: str, package_version: str,
                        package_description: str, files_to_package: list[tuple[str, str]],
-                       progress_callback=None) -> tuple[bool, str]:
+                       progress_callback=None, presorted: bool = False) -> tuple[bool, str]:
     """
     Builds the final .sdkk package file.
     files_to_package is a list of (host_path, internal_path) tuples.
     The first file in the list is assumed to be the main executable.
+    Entries are stored sorted by internal path; pass presorted=True if the
+    list is already in that order. The caller's list is never modified.
     """
     def report_progress(message):
-        """Helper to send messages via callback and print."""
+        """
+        Helper to send messages via callback and print.
+        'message' may be a zero-argument callable (used in per-file loops) so
+        the text is only formatted when there is a callback to receive it.
+        """
         # print(f"BUILD_PACKAGE: {message}") # Keep console print for debug
-        if progress_callback:
-            progress_callback(f"Package: {message}") # Send to GUI status bar/log
+        if progress_callback is None:
+            return
+        if callable(message):
+            message = message()
+        progress_callback(f"Package: {message}") # Send to GUI status bar/log
 
     report_progress(f"Starting SDKK package building for '{package_name}'...")
 
@@ -404,40 +944,59 @@ def build_sdkk_package(output_sdkk_path: str, package_name: str, package_version
     if not files_to_package:
          return False, "At least one file must be included in the package."
 
-    # Validate host paths exist
-    for host_path, _ in files_to_package:
-        if not os.path.exists(host_path):
-            return False, f"Input file not found: '{host_path}'"
+    # Encode and NUL-pad the fixed-size header strings once, up front
+    # (each field keeps at least one terminating NUL byte)
+    package_name_field = package_name.encode('utf-8')[:63].ljust(64, b'\0')
+    package_version_field = package_version.encode('utf-8')[:15].ljust(16, b'\0')
+    package_description_field = package_description.encode('utf-8')[:255].ljust(256, b'\0')
 
     # Prepare file entries data and calculate data section size
     file_entries_data = [] # This will store dicts with all info needed for SDKKModuleEntry
     current_data_offset = 0
     data_section_size = 0
 
-    # Sort files by internal path (important for consistent package structure)
-    files_to_package.sort(key=lambda item: item[1])
+    # Remember the main executable *before* sorting - it is the caller's first
+    # entry, which is not necessarily the first one by internal path.
+    main_file_item = files_to_package[0]
 
-    # Determine module types and flags based on position (first is executable)
-    is_first_file = True
-    for host_path, internal_path in files_to_package:
+    # Sort files by internal path (important for consistent package structure)
+    if not presorted:
+        files_to_package = sorted(files_to_package, key=operator.itemgetter(1))
+
+    # Determine module types and flags (only the main file is executable).
+    # A single os.stat per file both validates that it exists and gives its size.
+    for file_item in files_to_package:
+        host_path, internal_path = file_item
+        is_main_file = file_item is main_file_item
         try:
-            file_size = os.path.getsize(host_path)
+            file_stat = os.stat(host_path)
+            file_size = file_stat.st_size
+
+            # Plain ints (see doors_sdk), so the packing loop handles no IntEnum objects
+            module_type = SDKK_TYPE_APPLICATION if is_main_file else SDKK_TYPE_DATA
+            module_flags = SDKK_FLAG_EXECUTABLE if is_main_file else 0 # No other flags by default
 
-            module_type = SDKKModuleType.APPLICATION if is_first_file else SDKKModuleType.DATA
-            module_flags = SDKKModuleFlag.EXECUTABLE if is_first_file else 0 # No other flags by default
+            # Ensure internal_path is max 63 bytes + null terminator = 64 bytes
+            internal_path_bytes = internal_path.encode('utf-8')
+            if len(internal_path_bytes) >= 64:
+                 report_progress(f"Warning: Internal path '{internal_path}' is too long ({len(internal_path_bytes)} bytes), truncating.")
+                 internal_path_bytes = internal_path_bytes[:63]
 
             file_entries_data.append({
                 "host_path": host_path,
                 "internal_path": internal_path,
+                "name_padded": internal_path_bytes.ljust(64, b'\0'),
                 "offset": current_data_offset,
                 "size": file_size,
+                "mtime_ns": file_stat.st_mtime_ns,
                 "type": module_type,
                 "flags": module_flags,
-                "signature": b'\0' * 32 # Default to empty signature (32 bytes for 8x uint32_t)
+                "signature": b'\0' * 32 # Patched with the file's SHA-256 after the data is written (8x uint32_t)
             })
             current_data_offset += file_size
             data_section_size += file_size
-            is_first_file = False # Only the first file gets app/exec flags
+        except FileNotFoundError:
+            return False, f"Input file not found: '{host_path}'"
         except OSError as e:
             return False, f"Error getting size of file '{host_path}': {e}"
 
@@ -474,139 +1033,142 @@ def build_sdkk_package(output_sdkk_path: str, package_name: str, package_version
 
     try:
         with open(output_sdkk_path, "wb") as f:
+            # 0. Reserve the final size up front so the filesystem can allocate
+            # contiguous extents instead of growing the file write by write
+            total_package_size = data_section_offset + data_section_size
+            _preallocate_file(f, total_package_size, report_progress)
+
             # 1. Write dummy header (will be updated later)
             f.write(b'\0' * SDKKPackageHeader.SIZE)
             report_progress("Wrote dummy header placeholder.")
 
-            # 2. Write file entries table
+            # 2. Write file entries table (the header placeholder was written from offset 0)
             report_progress("Writing file entries table...")
-            if f.tell() != entries_table_offset:
-                 report_progress(f"Warning: Current file position ({f.tell()}) does not match calculated entries offset ({entries_table_offset}). Seeking.")
-                 f.seek(entries_table_offset)
+            assert f.tell() == entries_table_offset, "entries table must follow the header"
 
+            # Pack all entries (names were padded in the sizing pass) into one
+            # preallocated buffer. The buffer already includes the zero padding up
+            # to the data section, so the table and padding go out in a single write.
+            entries_buffer = bytearray(entries_table_size + padding_after_entries)
+            entry_buffer_offset = 0
             for entry_info in file_entries_data:
-                # Ensure internal_path is max 63 bytes + null terminator = 64 bytes
-                internal_path_bytes = entry_info["internal_path"].encode('utf-8')
-                if len(internal_path_bytes) >= 64:
-                     report_progress(f"Warning: Internal path '{entry_info['internal_path']}' is too long ({len(internal_path_bytes)} bytes), truncating.")
-                     internal_path_bytes = internal_path_bytes[:63]
-
-                module_entry = SDKKModuleEntry(
-                    name=internal_path_bytes.ljust(64, b'\0'),
-                    offset=entry_info["offset"],
-                    size=entry_info["size"],
-                    type=entry_info["type"].value, # Use .value for IntEnum
-                    flags=entry_info["flags"].value, # Use .value for IntEnum
-                    signature=entry_info["signature"],
-                    padding=b'\0' * (SDKKModuleEntry.SIZE - (64 + 8 + 8 + 4 + 4 + 32)) # Calculate padding dynamically
+                entries_buffer[entry_buffer_offset:entry_buffer_offset + SDKKModuleEntry.SIZE] = pack_entry(
+                    entry_info["name_padded"],
+                    entry_info["offset"],
+                    entry_info["size"],
+                    entry_info["type"],
+                    entry_info["flags"],
+                    entry_info["signature"]
                 )
-                f.write(module_entry.pack())
-                report_progress(f"  - Wrote entry for '{entry_info['internal_path']}' (offset={entry_info['offset']}, size={entry_info['size']}, type={entry_info['type'].name}, flags={entry_info['flags']})")
+                entry_buffer_offset += SDKKModuleEntry.SIZE
+                report_progress(lambda: f"  - Packed entry for '{entry_info['internal_path']}' (offset={entry_info['offset']}, size={entry_info['size']}, type={SDKKModuleType(entry_info['type']).name}, flags={entry_info['flags']} [{'|'.join(module_flag_names(entry_info['flags'])) or 'none'}])")
+            # 3. Padding after the entries table is the zeroed tail of the same buffer
+            if padding_after_entries > 0:
+                report_progress(f"Writing entries table with {padding_after_entries} bytes of padding.")
+            f.write(entries_buffer)
 
             report_progress("Finished writing file entries table.")
 
-            # 3. Write padding after entries table
-            if padding_after_entries > 0:
-                report_progress(f"Writing {padding_after_entries} bytes of padding.")
-                f.write(b'\0' * padding_after_entries)
-
             # 4. Write data section and calculate hash
             report_progress("Writing data section and calculating hash...")
             sha256_hasher = hashlib.sha256()
-            current_pos = f.tell()
-            if current_pos != data_section_offset:
-                 report_progress(f"Warning: Current file position ({current_pos}) does not match calculated data offset ({data_section_offset}). Seeking to correct position.")
-                 f.seek(data_section_offset)
-
-            for entry_info in file_entries_data:
-                report_progress(f"  - Writing content for '{entry_info['internal_path']}' from '{entry_info['host_path']}'...")
-                try:
-                    with open(entry_info["host_path"], "rb") as infile:
-                        bytes_written_for_file = 0
-                        while True:
-                            chunk = infile.read(4096) # Read in chunks
-                            if not chunk:
-                                break
-                            f.write(chunk)
-                            sha256_hasher.update(chunk)
-                            bytes_written_for_file += len(chunk)
-                        if bytes_written_for_file != entry_info["size"]:
-                             report_progress(f"Warning: Bytes written for '{entry_info['internal_path']}' ({bytes_written_for_file}) does not match expected size ({entry_info['size']}).")
-                except IOError as e:
-                     # This is a critical error during packaging
-                     raise IOError(f"Failed to read file '{entry_info['host_path']}' for packaging: {e}")
-
+            assert f.tell() == data_section_offset, "data section must follow the entries table padding"
+
+            # Inputs are mmapped (see below); the fallback read loop fills reusable
+            # 1 MiB buffers in place with readinto(). Either way the data is written
+            # here and hashed concurrently on a worker thread - into the data section
+            # hash and into a per-file SHA-256 for the entry's signature field, so no
+            # input is read twice.
+            background_hasher = _BackgroundHasher(sha256_hasher, DATA_COPY_CHUNK_SIZE)
+            use_sendfile = hasattr(os, "sendfile")
+            try:
+                for entry_info in file_entries_data:
+                    report_progress(lambda: f"  - Writing content for '{entry_info['internal_path']}' from '{entry_info['host_path']}'...")
+                    file_hasher = entry_info["file_hasher"] = hashlib.sha256()
+                    try:
+                        with open(entry_info["host_path"], "rb") as infile:
+                            bytes_written_for_file = 0
+                            # Map the input so it is hashed (worker thread) and written straight
+                            # from the page cache. Empty or unmappable files use the read loop.
+                            mapped = None
+                            if entry_info["size"] > 0:
+                                try:
+                                    mapped = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+                                except (OSError, ValueError):
+                                    mapped = None
+                            if mapped is not None:
+                                with mapped:
+                                    background_hasher.submit_external(mapped, len(mapped), file_hasher)
+                                    try:
+                                        if use_sendfile and len(mapped) >= SENDFILE_THRESHOLD:
+                                            # Large file: the kernel copies the pages with sendfile
+                                            bytes_written_for_file = _sendfile_copy(f, infile, len(mapped))
+                                        if bytes_written_for_file < len(mapped):
+                                            # Small file, or sendfile unavailable for this target
+                                            f.write(memoryview(mapped)[bytes_written_for_file:])
+                                            bytes_written_for_file = len(mapped)
+                                        infile.seek(bytes_written_for_file)
+                                    finally:
+                                        background_hasher.wait() # The map must outlive the hashing
+                            # Read loop: empty/unmappable files, or data appended since mapping
+                            while True:
+                                copy_buffer = background_hasher.acquire_buffer()
+                                bytes_read = infile.readinto(copy_buffer)
+                                if not bytes_read:
+                                    background_hasher.release_buffer(copy_buffer)
+                                    break
+                                background_hasher.submit(copy_buffer, bytes_read, file_hasher)
+                                f.write(memoryview(copy_buffer)[:bytes_read])
+                                bytes_written_for_file += bytes_read
+                            if bytes_written_for_file != entry_info["size"]:
+                                 report_progress(f"Warning: Bytes written for '{entry_info['internal_path']}' ({bytes_written_for_file}) does not match expected size ({entry_info['size']}).")
+                    except IOError as e:
+                         # This is a critical error during packaging
+                         raise IOError(f"Failed to read file '{entry_info['host_path']}' for packaging: {e}")
+            finally:
+                # Always stop the worker; re-raises a hashing error if one occurred
+                background_hasher.close()
+
+            # Drop any preallocated tail (only possible if an input shrank meanwhile)
+            if f.tell() != total_package_size:
+                f.truncate(f.tell())
 
             data_sha256_hash = sha256_hasher.digest()
             report_progress(f"Calculated data SHA-256 hash: {data_sha256_hash.hex()}")
             report_progress("Finished writing data section.")
 
+            # 4b. Fill in the per-file SHA-256 signatures: patch the 32-byte field of
+            # every entry in the table buffer and rewrite the table in place
+            for entry_index, entry_info in enumerate(file_entries_data):
+                signature_offset = entry_index * SDKKModuleEntry.SIZE + SDKKModuleEntry.SIGNATURE_POS
+                entries_buffer[signature_offset:signature_offset + 32] = entry_info["file_hasher"].digest()
+            f.seek(entries_table_offset)
+            f.write(memoryview(entries_buffer)[:entries_table_size])
+            report_progress("Wrote per-file signatures into the entries table.")
+
             # 5. Update SDKK header
             report_progress("Updating SDKK header...")
             f.seek(0) # Go back to the beginning of the file
 
-            # Create a temporary header object for checksum calculation
-            temp_header = SDKKPackageHeader(
-                magic=b'SDKK',
-                format_version=SDKK_FORMAT_VERSION, # Use the constant from doors_sdk
-                package_name=package_name.encode('utf-8')[:63].ljust(64, b'\0'),
-                package_version_str=package_version.encode('utf-8')[:15].ljust(16, b'\0'),
-                package_description=package_description.encode('utf-8')[:255].ljust(256, b'\0'),
-                entry_count=num_files,
-                entries_table_offset=entries_table_offset,
-                data_section_offset=data_section_offset,
-                data_section_size=data_section_size,
-                data_sha256_hash=data_sha256_hash,
-                reserved=b'\0' * 108,
-                header_checksum=0 # Placeholder for checksum calculation
-            )
-            # Pack everything *except* the final checksum field for checksum calculation
-            # This requires packing the first part of the format string.
-            header_content_for_checksum = struct.pack(
-                SDKKPackageHeader.FORMAT[:-1], # Exclude the last 'I' for checksum
-                temp_header.magic,
-                temp_header.format_version,
-                temp_header.package_name,
-                temp_header.package_version_str,
-                temp_header.package_description,
-                temp_header.entry_count,
-                temp_header.entries_table_offset,
-                temp_header.data_section_offset,
-                temp_header.data_section_size,
-                temp_header.data_sha256_hash,
-                temp_header.reserved
-            )
-            header_checksum_val = sum(header_content_for_checksum) & 0xFFFFFFFF
-
-            # Create the final header object with the calculated checksum
-            final_header = SDKKPackageHeader(
-                magic=b'SDKK',
-                format_version=SDKK_FORMAT_VERSION,
-                package_name=package_name.encode('utf-8')[:63].ljust(64, b'\0'),
-                package_version_str=package_version.encode('utf-8')[:15].ljust(16, b'\0'),
-                package_description=package_description.encode('utf-8')[:255].ljust(256, b'\0'),
-                entry_count=num_files,
-                entries_table_offset=entries_table_offset,
-                data_section_offset=data_section_offset,
-                data_section_size=data_section_size,
-                data_sha256_hash=data_sha256_hash,
-                reserved=b'\0' * 108,
-                header_checksum=header_checksum_val
-            )
-
-            final_header_data = final_header.pack()
-
-            if len(final_header_data) != SDKKPackageHeader.SIZE:
-                 error_msg = f"Internal Error: Calculated final header size ({len(final_header_data)}) does not match expected SDKKPackageHeader.SIZE ({SDKKPackageHeader.SIZE})."
-                 report_progress(error_msg)
-                 # Clean up the partially written file
-                 if os.path.exists(output_sdkk_path):
-                     try: os.remove(output_sdkk_path)
-                     except OSError: pass
-                 return False, error_msg
+            # Pack the header with a zero checksum (no SDKKPackageHeader instance is
+            # needed just to be packed and dropped), then patch only the checksum field.
+            header_buffer = bytearray(pack_header(
+                package_name_field,
+                package_version_field,
+                package_description_field,
+                num_files,
+                entries_table_offset,
+                data_section_offset,
+                data_section_size,
+                data_sha256_hash,
+                format_version=SDKK_FORMAT_VERSION # Use the constant from doors_sdk
+            ))
+            # The checksum covers everything *except* the final checksum field itself
+            header_checksum = _compute_header_checksum(memoryview(header_buffer)[:_HEADER_CHECKSUM_OFFSET])
+            _HEADER_CHECKSUM_STRUCT.pack_into(header_buffer, _HEADER_CHECKSUM_OFFSET, header_checksum)
 
             f.seek(0) # Ensure we are at the start
-            f.write(final_header_data)
+            f.write(header_buffer)
             report_progress("SDKK header updated with metadata, offsets, hash, and checksum.")
 
         report_progress(f"SDKK package '{os.path.basename(output_sdkk_path)}' built successfully.")
@@ -635,9 +1197,17 @@ def build_project(source_file: str, output_sdkk_path: str, package_name: str,
                   package_version: str, package_description: str,
                   additional_files: list[tuple[str, str]],
                   arch: str = "x86_64", entry: str = "_start",
-                  mingw_path: str = "C:/msys64/mingw64/bin", progress_callback=None) -> tuple[bool, str]:
+                  mingw_path: str = "C:/msys64/mingw64/bin", progress_callback=None,
+                  use_cache: bool = True, timeout=None, source_bytes: bytes = None) -> tuple[bool, str]:
     """
     Orchestrates the full build process: compile source to binary, then package into SDKK.
+    Compiled binaries are cached in the per-user cache directory (or SDKK_CACHE_DIR)
+    unless use_cache is False; it is kept out of the build directory because
+    deploy_to_qemu exposes that directory to the guest.
+    timeout limits each toolchain command (seconds; 0 = no limit). When it is
+    None, the SDKK_BUILD_TIMEOUT environment variable or the 300 s default is used.
+    source_bytes optionally passes the text of source_file when the caller just
+    wrote it, so it is not read back (see _compute_compile_cache_key).
     """
     def report_progress(message):
         """Helper to send messages via callback and print."""
@@ -648,45 +1218,44 @@ def build_project(source_file: str, output_sdkk_path: str, package_name: str,
 
     report_progress(f"Starting full build process for package '{package_name}'...")
 
-    # Create a temporary path for the intermediate binary within the build directory
-    build_dir = os.path.dirname(output_sdkk_path)
-    temp_binary_dir_base = os.path.join(build_dir, "temp_bin")
-    temp_binary_dir = None
-    for i in range(100): # Try a few times to find a unique name
-        temp_binary_dir_candidate = f"{temp_binary_dir_base}_{int(time.time())}_{i}"
-        if not os.path.exists(temp_binary_dir_candidate):
-            temp_binary_dir = temp_binary_dir_candidate
-            break
-        time.sleep(0.01) # Small delay before retrying
-
-    if temp_binary_dir is None:
-         error_msg = f"Error: Could not create a unique temporary binary directory base on '{temp_binary_dir_base}'."
-         report_progress(error_msg)
-         return False, error_msg
+    # Get a temporary directory for the intermediate binary (in the system temp
+    # directory). It is pooled and reused by later builds instead of being
+    # created and removed every time; only the binary inside is deleted.
+    try:
+        temp_binary_dir = _acquire_workspace()
+    except OSError as e:
+        error_msg = f"Error creating temporary binary directory: {e}"
+        report_progress(error_msg)
+        return False, error_msg
 
     temp_binary_path = os.path.join(temp_binary_dir, "entry_binary.bin")
 
     report_progress(f"Temporary binary will be created at: {temp_binary_path}")
 
-    # Ensure the temporary binary directory exists
-    try:
-        os.makedirs(temp_binary_dir, exist_ok=True)
-    except OSError as e:
-        error_msg = f"Error creating temporary binary directory '{temp_binary_dir}': {e}"
-        report_progress(error_msg)
-        return False, error_msg
+    def release_workspace():
+        """Deletes the intermediate binary and returns its directory to the pool."""
+        try:
+            os.unlink(temp_binary_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Leave an unclean directory out of the pool
+            report_progress(f"Warning: Failed to remove temporary binary {temp_binary_path}: {e}")
+            return
+        _release_workspace(temp_binary_dir)
 
 
     # --- Step 1: Compile Source to Raw Binary ---
     report_progress("Step 1/2: Compiling main source file to raw binary...")
-    success, message = compile_to_raw_binary(source_file, temp_binary_path, arch, entry, mingw_path, progress_callback)
+    compile_cache_dir = _default_compile_cache_dir()
+    success, message = compile_to_raw_binary(source_file, temp_binary_path, arch, entry, mingw_path, progress_callback,
+                                             cache_dir=compile_cache_dir, use_cache=use_cache,
+                                             timeout=_resolve_command_timeout(timeout),
+                                             source_bytes=source_bytes)
 
     if not success:
         report_progress("Compilation step failed.")
-        # Cleanup temp binary dir on failure
-        if os.path.exists(temp_binary_dir):
-            try: shutil.rmtree(temp_binary_dir)
-            except OSError: pass
+        release_workspace()
         return False, f"Compilation failed:\n{message}"
 
     report_progress("Compilation step successful.")
@@ -701,14 +1270,24 @@ def build_project(source_file: str, output_sdkk_path: str, package_name: str,
 
     files_to_package_for_sdkk = [(temp_binary_path, entry_internal_path)]
 
+    # Check that the additional files exist. The stats block on I/O without
+    # holding the GIL, so for many assets on a cold cache they run in parallel.
+    additional_host_paths = [host_path for host_path, _ in additional_files]
+    if len(additional_host_paths) > 1:
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(MAX_STAT_WORKERS, len(additional_host_paths))) as executor:
+            host_path_exists = list(executor.map(os.path.exists, additional_host_paths))
+    else:
+        host_path_exists = [os.path.exists(host_path) for host_path in additional_host_paths]
+
     # Add additional files, checking for duplicate internal paths
     existing_internal_paths = {entry_internal_path}
-    for host_path, internal_path in additional_files:
+    for (host_path, internal_path), exists in zip(additional_files, host_path_exists):
         normalized_internal_path = internal_path.replace("\\", "/")
         if normalized_internal_path in existing_internal_paths:
             report_progress(f"Warning: Duplicate internal path '{normalized_internal_path}' specified for host file '{host_path}'. Skipping this file.")
             continue # Skip this file
-        if not os.path.exists(host_path):
+        if not exists:
              report_progress(f"Warning: Additional file '{host_path}' not found. Skipping.")
              continue # Skip missing files
         files_to_package_for_sdkk.append((host_path, normalized_internal_path))
@@ -718,10 +1297,7 @@ def build_project(source_file: str, output_sdkk_path: str, package_name: str,
     if not os.path.exists(temp_binary_path):
          error_msg = f"Internal Error: Compiled binary not found at '{temp_binary_path}' after successful compilation report."
          report_progress(error_msg)
-         # Cleanup temp binary dir on failure
-         if os.path.exists(temp_binary_dir):
-             try: shutil.rmtree(temp_binary_dir)
-             except OSError: pass
+         release_workspace()
          return False, error_msg
 
     success, message = build_sdkk_package(output_sdkk_path, package_name, package_version,
@@ -729,13 +1305,8 @@ def build_project(source_file: str, output_sdkk_path: str, package_name: str,
                                           progress_callback)
 
     # --- Cleanup ---
-    report_progress(f"Cleaning up temporary binary directory: {temp_binary_dir}")
-    if os.path.exists(temp_binary_dir):
-        try:
-            shutil.rmtree(temp_binary_dir)
-            report_progress("Temporary binary directory cleaned up.")
-        except OSError as e:
-            report_progress(f"Warning: Failed to clean up temporary binary directory {temp_binary_dir}: {e}")
+    report_progress(f"Cleaning up temporary binary: {temp_binary_path}")
+    release_workspace()
 
 
     if success:
@@ -1,7 +1,35 @@
 ﻿import re
+import sys
+from collections import OrderedDict
 import tkinter as tk
 from tkinter import ttk # Use ttk for scrollbar
 
+# Compiled once at import; one finditer over the raw buffer does all the work.
+# Comments are matched (and ignored) by the first two alternatives, so anything
+# inside them is skipped without building comment-stripped copies of the source.
+# The others find #include "..." / #include <...> and DRO_MODULE("...")
+# (assumes this macro format). #include only counts at the start of a line and
+# within it, so every include _DEP finds is on a line _DEP_KEY_LINES matches.
+_DEP = re.compile(r'//[^\n]*|/\*.*?\*/'
+                  r'|^[ \t]*#include[ \t]+["<](?P<inc>[^">\n]+)[">]'
+                  r'|DRO_MODULE\s*\(\s*"(?P<mod>[^"]+)"\s*\)', re.DOTALL | re.MULTILINE)
+
+# The only lines that can change what _DEP finds: preprocessor directives,
+# DRO_MODULE uses (up to the closing paren, which may be on a later line) and
+# lines that open or close a block comment. Their text keys the parse cache.
+_DEP_KEY_LINES = re.compile(r'^[ \t]*#[^\n]*'
+                            r'|^[^\n]*(?:DRO_MODULE[^)]*|/\*|\*/)[^\n]*', re.MULTILINE)
+
+# Number of parse results kept, least recently used evicted first
+DEP_CACHE_SIZE = 32
+
+# Default delay (ms) after the last update_dependencies call before parsing
+UPDATE_DELAY_MS = 150
+
+# Placeholder rows, shared so an unchanged "nothing here" state is an identity match
+_NO_SOURCE_ITEMS = ["No source code to parse."]
+_NO_DEPENDENCIES_ITEMS = ["No dependencies found."]
+
 class DependencyViewer(tk.Frame): # Inherit from tk.Frame
     """
     A simple widget to display dependencies found in the source code.
@@ -24,7 +52,57 @@ class DependencyViewer(tk.Frame): # Inherit from tk.Frame
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-    def update_dependencies(self, source_code: str):
+        self._shown_items = None # Rows currently in the listbox (skip no-op redraws)
+        self._last_source = None # Source text the rows were parsed from (skip re-parsing)
+        self._pending = None # after() id of a scheduled parse
+        self._pending_source = None
+        self._dep_cache = OrderedDict() # Dependency-line text -> rows parsed from it
+        self.last_dependency_line = None # 1-based line of the last _DEP_KEY_LINES match in the parsed source, 0 if none
+
+    def update_dependencies(self, source_code: str, delay_ms: int = UPDATE_DELAY_MS):
+        """
+        Schedules a refresh of the dependency list. Calls made within 'delay_ms'
+        of each other are coalesced into one parse of the latest source.
+
+        Args:
+            source_code: The string content of the source file.
+            delay_ms: Debounce delay in milliseconds; 0 parses immediately
+                      (for callers that already coalesce their updates).
+        """
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+            self._pending = None
+        if delay_ms <= 0:
+            self._pending_source = None
+            self._do_update(source_code)
+            return
+        self._pending_source = source_code
+        self._pending = self.after(delay_ms, self._run_pending_update)
+
+    def affects_dependencies(self, first_line: int, edited_text: str) -> bool:
+        """
+        Returns False if an edit can't change the dependency list, so the caller
+        may skip update_dependencies: it lies entirely below the last dependency
+        line of the last parse and adds nothing _DEP_KEY_LINES would match.
+
+        Args:
+            first_line: 1-based first line of the edited span.
+            edited_text: Current text of the edited span (whole lines).
+        """
+        if self._pending is not None or self.last_dependency_line is None:
+            return True # A parse is still due, or there is nothing to compare against
+        if first_line <= self.last_dependency_line:
+            return True
+        return "#" in edited_text or "DRO_MODULE" in edited_text or "/*" in edited_text or "*/" in edited_text
+
+    def _run_pending_update(self):
+        """after() callback: parses the source stored by the last update_dependencies call."""
+        source_code = self._pending_source
+        self._pending = None
+        self._pending_source = None
+        self._do_update(source_code)
+
+    def _do_update(self, source_code: str):
         """
         Parses source code to find include directives and DRO_MODULEs,
         and updates the listbox. Handles basic comments.
@@ -32,53 +110,57 @@ class DependencyViewer(tk.Frame): # Inherit from tk.Frame
         Args:
             source_code: The string content of the source file.
         """
-        self.listbox.delete(0, tk.END)
+        # Unchanged buffer (e.g. a cursor move or a re-highlight): nothing to do.
+        # Comparing with the previous text is a C-level memcmp and, unlike a hash,
+        # can never report a false match.
+        if source_code == self._last_source:
+             return
+        self._last_source = source_code
 
         if not source_code:
-             self.listbox.insert(tk.END, "No source code to parse.")
+             self.last_dependency_line = 0
+             self._show_items(_NO_SOURCE_ITEMS)
              return
 
-        # Process line by line to handle comments more easily
-        lines = source_code.splitlines()
-        in_multiline_comment = False
-        found_dependencies = False
-
-        for line in lines:
-            line = line.strip()
-
-            # Basic multi-line comment handling
-            # This is not perfect but handles common cases
-            if '/*' in line and '*/' not in line:
-                in_multiline_comment = True
-                continue
-            if '*/' in line and in_multiline_comment:
-                in_multiline_comment = False
-                continue
-            if in_multiline_comment:
-                continue
-
-            # Ignore single-line comments //
-            line_without_comment = line.split('//', 1)[0].strip()
-
-            if not line_without_comment:
-                continue # Skip empty or comment-only lines
-
-            # Find #include "..." or #include <...>
-            include_match = re.search(r'#include\s+["<]([^">]+)[">]', line_without_comment)
-            if include_match:
-                self.listbox.insert(tk.END, f"Header: {include_match.group(1)}")
-                found_dependencies = True
-                continue
-
-            # Find DRO_MODULE "..."
-            # This assumes a specific macro format. Adjust if needed.
-            dro_module_match = re.search(r'DRO_MODULE\s*\(\s*"([^"]+)"\s*\)', line_without_comment)
-            if dro_module_match:
-                self.listbox.insert(tk.END, f"Module: {dro_module_match.group(1)}")
-                found_dependencies = True
-                continue
-
-        # Add a message if no dependencies found
-        if not found_dependencies:
-             self.listbox.insert(tk.END, "No dependencies found.")
-
+        # Edits to ordinary code lines leave the dependency lines alone, so the
+        # rows parsed for the same dependency lines before can be reused as is.
+        key_lines = list(_DEP_KEY_LINES.finditer(source_code))
+        key = "\n".join(match.group(0) for match in key_lines)
+        self.last_dependency_line = source_code.count("\n", 0, key_lines[-1].end()) + 1 if key_lines else 0
+        items = self._dep_cache.get(key)
+        if items is not None:
+            self._dep_cache.move_to_end(key)
+            self._show_items(items)
+            return
+
+        # Single scan of the whole buffer; comment matches have no named group.
+        # Rows are interned: the same headers recur across parses and files, so
+        # identical rows share one string and compare by identity first.
+        items = []
+        for match in _DEP.finditer(source_code):
+            kind = match.lastgroup
+            if kind == 'inc':
+                items.append(sys.intern(f"Header: {match.group('inc')}"))
+            elif kind == 'mod':
+                items.append(sys.intern(f"Module: {match.group('mod')}"))
+
+        # Show a message if no dependencies found
+        if not items:
+             items = _NO_DEPENDENCIES_ITEMS
+
+        self._dep_cache[key] = items
+        if len(self._dep_cache) > DEP_CACHE_SIZE:
+            self._dep_cache.popitem(last=False)
+        self._show_items(items)
+
+    def _show_items(self, items: list[str]):
+        """
+        Replaces the listbox rows with 'items'. Does nothing if they are unchanged
+        (the editor calls update_dependencies on every edit), otherwise uses one
+        delete and one insert call instead of a Tcl round-trip per row.
+        """
+        if items is self._shown_items or items == self._shown_items:
+            return
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *items)
+        self._shown_items = items
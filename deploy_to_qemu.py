@@ -2,7 +2,8 @@
 import os
 import shutil
 import sys
-import shlex # Added for safer command splitting if needed, though list is better
+import stat
+import shlex # Used to quote the logged command line
 
 # --- Configuration (Defaults - will be overridden by GUI) ---
 # DEFAULT_KERNEL_ELF and DEFAULT_BUILD_DIR are now parameters
@@ -19,12 +20,22 @@ elif sys.platform.startswith('darwin'): # macOS
 else:
     QEMU_EXECUTABLE = 'qemu-system-x86_64' # Default guess
 
-# Define base QEMU command arguments (kernel and hda paths will be filled by function args)
-# Use placeholders that are unlikely to conflict with actual paths
-BASE_QEMU_ARGS = [
-    QEMU_EXECUTABLE,
-    '-kernel', '__KERNEL_ELF_PLACEHOLDER__', # Placeholder for kernel path
-    '-hda', '__HDA_PATH_PLACEHOLDER__',     # Placeholder for build dir (as hda)
+# Absolute QEMU path found on PATH (resolved once; see _qemu_executable_path)
+_QEMU_PATH = shutil.which(QEMU_EXECUTABLE)
+
+def _qemu_executable_path() -> str:
+    """
+    Returns the cached absolute QEMU path, so Popen does not search PATH on
+    every deploy. If QEMU was not found at import time the lookup is retried
+    (it may have been installed since); the bare name is the last resort.
+    """
+    global _QEMU_PATH
+    if _QEMU_PATH is None:
+        _QEMU_PATH = shutil.which(QEMU_EXECUTABLE)
+    return _QEMU_PATH or QEMU_EXECUTABLE
+
+# Fixed QEMU options appended after the kernel and disk arguments
+QEMU_COMMON_ARGS = [
     '-m', '256M', # Example: Allocate 256MB RAM
     '-serial', 'stdio' # Example: Redirect serial output to console (useful for debugging)
     # Add other common QEMU options here if needed, e.g., -cpu host, -smp 2
@@ -34,12 +45,26 @@ BASE_QEMU_ARGS = [
     # '-display', 'gtk', # Or 'sdl', 'none' etc. depending on needs and platform
 ]
 
+def _build_qemu_cmd(kernel_elf: str, build_dir: str, extra_args: list[str] = None) -> list[str]:
+    """
+    Returns the QEMU argv: the kernel ELF, the build directory exposed as a
+    FAT disk (fat:rw:), the common options and any extra arguments.
+    """
+    return [
+        _qemu_executable_path(),
+        '-kernel', os.path.normpath(kernel_elf),
+        # QEMU fat: expects a host path; os.path.normpath is usually sufficient
+        '-hda', f'fat:rw:{os.path.normpath(build_dir)}',
+        *QEMU_COMMON_ARGS,
+        *(extra_args or []),
+    ]
+
 # --- Helper Function for Running Commands (reused/adapted) ---
 def _run_deploy_command(cmd: list[str], cwd: str = None, progress_callback=None) -> tuple[bool, str]:
     """Helper function to run a command and capture output."""
-    cmd_str = " ".join(subprocess.list2cmdline(cmd).split())
     if progress_callback:
-        progress_callback(f"Executing: {cmd_str}")
+        # Only built for the log; shlex.join quotes arguments with spaces unambiguously
+        progress_callback(f"Executing: {shlex.join(cmd)}")
     # print(f"Executing: {cmd_str}") # Keep console print for debug
 
     try:
@@ -67,6 +92,59 @@ def _run_deploy_command(cmd: list[str], cwd: str = None, progress_callback=None)
         # print(error_message) # Keep console print for debug
         return False, error_message
 
+# --- Input Validation Helper ---
+def _is_valid_input(path: str, want_dir: bool = False) -> bool:
+    """
+    Checks with a single os.stat that 'path' is a regular file (or a directory
+    when want_dir is True). Errors such as a missing path count as invalid.
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except (OSError, ValueError):
+        return False
+    return stat.S_ISDIR(mode) if want_dir else stat.S_ISREG(mode)
+
+# --- Directory Creation Cache ---
+# Application directories already created (or found) by this process, so later
+# deploys skip makedirs' stat/mkdir calls. An entry is dropped again if copying
+# into the directory fails because it has disappeared.
+_ENSURED_DIRS: set[str] = set()
+
+def _ensure_dir(path: str) -> bool:
+    """
+    Creates 'path' (like os.makedirs(exist_ok=True)) unless it was already
+    ensured earlier in this process. Returns True if makedirs actually ran.
+    """
+    if path in _ENSURED_DIRS:
+        return False
+    os.makedirs(path, exist_ok=True)
+    _ENSURED_DIRS.add(path)
+    return True
+
+# --- Atomic Publish Helper ---
+def _publish_file(src: str, dest: str):
+    """
+    Copies 'src' to 'dest' atomically: the data goes to a staging file next to
+    'dest' first, which then replaces it with os.replace, so QEMU never sees a
+    partially written package. The staging file is removed if anything fails.
+    """
+    staging_path = f"{dest}.{os.getpid()}.tmp"
+    try:
+        if sys.platform.startswith('win'):
+            # copy2 is a single kernel-side CopyFile2 call on Windows (Python 3.12+)
+            shutil.copy2(src, staging_path)
+        else:
+            # copyfile copies in the kernel (sendfile/fcopyfile); the metadata
+            # round-trip of copy2 is not needed for the deployed package
+            shutil.copyfile(src, staging_path)
+        os.replace(staging_path, dest)
+    except BaseException:
+        try:
+            os.unlink(staging_path)
+        except OSError:
+            pass
+        raise
+
 # --- Main Deploy Function ---
 def deploy_to_qemu(sdkk_file: str, kernel_elf: str, build_dir: str, app_subdir: str,
                     qemu_extra_args: list[str] = None, progress_callback=None) -> tuple[bool, str]:
@@ -86,62 +164,37 @@ def deploy_to_qemu(sdkk_file: str, kernel_elf: str, build_dir: str, app_subdir:
         A tuple: (success: bool, message: str).
     """
     def report_progress(message):
-        """Helper to send messages via callback and print."""
+        """
+        Helper to send messages via callback and print.
+        'message' may be a zero-argument callable, formatted only when a callback is set.
+        """
         # print(f"DEPLOY: {message}") # Keep console print for debug
-        if progress_callback:
-            progress_callback(f"Deploy: {message}") # Send to GUI status bar/log
+        if progress_callback is None:
+            return
+        if callable(message):
+            message = message()
+        progress_callback(f"Deploy: {message}") # Send to GUI status bar/log
 
     report_progress(f"Starting deployment process for '{os.path.basename(sdkk_file)}'...")
 
-    # Validate input paths
-    if not os.path.exists(sdkk_file):
-        report_progress(f"Error: SDKK file not found: '{sdkk_file}'")
-        return False, f"Error: SDKK file not found: '{sdkk_file}'"
+    # Validate input paths (one stat each, which also checks the file type)
+    if not _is_valid_input(sdkk_file):
+        report_progress(f"Error: SDKK file not found or is not a file: '{sdkk_file}'")
+        return False, f"Error: SDKK file not found or is not a file: '{sdkk_file}'"
 
-    if not os.path.exists(kernel_elf):
-        report_progress(f"Error: Kernel ELF not found: '{kernel_elf}'")
-        return False, f"Error: Kernel ELF not found: '{kernel_elf}'"
+    if not _is_valid_input(kernel_elf):
+        report_progress(f"Error: Kernel ELF not found or is not a file: '{kernel_elf}'")
+        return False, f"Error: Kernel ELF not found or is not a file: '{kernel_elf}'"
 
-    if not os.path.isdir(build_dir):
+    if not _is_valid_input(build_dir, want_dir=True):
         report_progress(f"Error: Build directory not found or is not a directory: '{build_dir}'")
         return False, f"Error: Build directory not found or is not a directory: '{build_dir}'"
 
     # Construct the full QEMU command list
-    actual_qemu_cmd = BASE_QEMU_ARGS[:] # Start with a copy of base args
-
-    # Find and replace kernel and hda placeholders
-    try:
-        # Find index of '-kernel' and replace the *next* element
-        kernel_idx = actual_qemu_cmd.index('-kernel')
-        if kernel_idx + 1 < len(actual_qemu_cmd):
-            actual_qemu_cmd[kernel_idx + 1] = os.path.normpath(kernel_elf) # Use normalized path
-        else:
-             error_msg = "Internal Error: Malformed BASE_QEMU_ARGS (missing kernel path placeholder after -kernel)"
-             report_progress(error_msg)
-             return False, error_msg
-
-        # Find index of '-hda' and replace the *next* element
-        hda_idx = actual_qemu_cmd.index('-hda')
-        if hda_idx + 1 < len(actual_qemu_cmd):
-            # Use fat:rw: to expose the build directory as a disk image
-            # Ensure build_dir path is normalized and correctly formatted for QEMU fat:
-            # QEMU fat: expects a host path. os.path.normpath is usually sufficient.
-            qemu_hda_path = f'fat:rw:{os.path.normpath(build_dir)}'
-            actual_qemu_cmd[hda_idx + 1] = qemu_hda_path
-        else:
-             error_msg = "Internal Error: Malformed BASE_QEMU_ARGS (missing hda path placeholder after -hda)"
-             report_progress(error_msg)
-             return False, error_msg
-
-    except ValueError as e:
-         error_msg = f"Internal Error: Missing expected argument placeholder in BASE_QEMU_ARGS: {e}"
-         report_progress(error_msg)
-         return False, error_msg
-
     # Add any extra arguments provided by the GUI (currently none, but for future use)
     if qemu_extra_args:
         report_progress(f"Adding extra QEMU arguments: {qemu_extra_args}")
-        actual_qemu_cmd.extend(qemu_extra_args)
+    actual_qemu_cmd = _build_qemu_cmd(kernel_elf, build_dir, qemu_extra_args)
 
 
     # Ensure the application destination directory exists within the build directory
@@ -149,7 +202,7 @@ def deploy_to_qemu(sdkk_file: str, kernel_elf: str, build_dir: str, app_subdir:
     app_dest_dir_on_host = os.path.join(build_dir, app_subdir)
     report_progress(f"Ensuring application directory exists on host (for QEMU FAT): '{app_dest_dir_on_host}'")
     try:
-        os.makedirs(app_dest_dir_on_host, exist_ok=True)
+        _ensure_dir(app_dest_dir_on_host)
         report_progress("Directory exists or created.")
     except OSError as e:
         error_msg = f"Error creating application directory '{app_dest_dir_on_host}': {e}"
@@ -160,15 +213,29 @@ def deploy_to_qemu(sdkk_file: str, kernel_elf: str, build_dir: str, app_subdir:
     app_dest_path_on_host = os.path.join(app_dest_dir_on_host, os.path.basename(sdkk_file))
     report_progress(f"Copying '{os.path.basename(sdkk_file)}' to '{app_dest_path_on_host}'...")
     try:
-        shutil.copy2(sdkk_file, app_dest_path_on_host) # Use copy2 to preserve metadata if needed
+        try:
+            _publish_file(sdkk_file, app_dest_path_on_host)
+        except FileNotFoundError:
+            # The application directory may have been removed since _ensure_dir
+            # cached it: forget the entry, recreate the directory and retry once
+            _ENSURED_DIRS.discard(app_dest_dir_on_host)
+            report_progress(f"Application directory missing, recreating '{app_dest_dir_on_host}'...")
+            _ensure_dir(app_dest_dir_on_host)
+            _publish_file(sdkk_file, app_dest_path_on_host)
         report_progress("File copied successfully.")
+    except FileNotFoundError as e:
+        # Don't trust the cache entry after a failed retry either
+        _ENSURED_DIRS.discard(app_dest_dir_on_host)
+        error_msg = f"Error copying SDKK file: {e}"
+        report_progress(error_msg)
+        return False, error_msg
     except shutil.Error as e:
         error_msg = f"Error copying SDKK file: {e}"
-        report_progress(error_message)
+        report_progress(error_msg)
         return False, error_msg
     except Exception as e:
          error_msg = f"An unexpected error occurred during file copy: {e}"
-         report_progress(error_message)
+         report_progress(error_msg)
          return False, error_msg
 
     # Run QEMU using subprocess.Popen with list of arguments
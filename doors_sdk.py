@@ -24,6 +24,33 @@ class SDKKModuleFlag(IntEnum):
     SIGNED = 0x04
     READONLY = 0x08
 
+# --- Plain-int Type/Flag Values ---
+# The IntEnums above are the public API. Looking up an IntEnum member goes
+# through EnumMeta and is several times slower than a plain module attribute,
+# so per-entry loops use these int copies, and the valid-value set and flag
+# mask for validation are precomputed here.
+SDKK_TYPE_APPLICATION = int(SDKKModuleType.APPLICATION)
+SDKK_TYPE_DRIVER = int(SDKKModuleType.DRIVER)
+SDKK_TYPE_DATA = int(SDKKModuleType.DATA)
+SDKK_TYPE_UPDATE = int(SDKKModuleType.UPDATE)
+SDKK_FLAG_EXECUTABLE = int(SDKKModuleFlag.EXECUTABLE)
+SDKK_FLAG_COMPRESSED = int(SDKKModuleFlag.COMPRESSED)
+SDKK_FLAG_SIGNED = int(SDKKModuleFlag.SIGNED)
+SDKK_FLAG_READONLY = int(SDKKModuleFlag.READONLY)
+SDKK_VALID_MODULE_TYPES = frozenset(int(module_type) for module_type in SDKKModuleType)
+SDKK_MODULE_FLAGS_MASK = sum(int(flag) for flag in SDKKModuleFlag) # 0x0F: all defined flag bits
+
+# Flag names for every combination of the defined bits (16 entries for 4 flags),
+# so decoding a flags value is one table lookup instead of a loop over the enum.
+_FLAG_NAMES_LUT = tuple(
+    tuple(flag.name for flag in SDKKModuleFlag if combination & flag)
+    for combination in range(SDKK_MODULE_FLAGS_MASK + 1)
+)
+
+def module_flag_names(flags: int) -> tuple[str, ...]:
+    """Returns the names of the defined SDKKModuleFlag bits set in 'flags' (undefined bits are ignored)."""
+    return _FLAG_NAMES_LUT[flags & SDKK_MODULE_FLAGS_MASK]
+
 # --- Error Codes (IntEnum for clarity) ---
 class SDKKErrorCode(IntEnum):
     """Defines standard error codes for SDKK operations."""
@@ -40,7 +67,8 @@ class SDKKErrorCode(IntEnum):
 # --- SDKK Package Header Structure ---
 # This structure is derived from the C header's intent and the builder.py's actual implementation.
 # It defines the binary layout of the 512-byte SDKK package header.
-@dataclass
+# slots=True: no per-instance __dict__ (smaller objects, faster attribute access)
+@dataclass(slots=True)
 class SDKKPackageHeader:
     """
     Represents the binary structure of the SDKK package header.
@@ -57,10 +85,12 @@ class SDKKPackageHeader:
     # Q: data_section_offset (uint64_t)
     # Q: data_section_size (uint64_t)
     # 32s: data_sha256_hash (uint8_t[32])
-    # 108s: reserved (char[108])
+    # 104s: reserved (char[104])
     # I: header_checksum (uint32_t)
-    FORMAT = "<4sI64s16s256sIQQQ32s108sI"
-    SIZE = struct.calcsize(FORMAT) # Should be 512 bytes
+    FORMAT = "<4sI64s16s256sIQQQ32s104sI"
+    STRUCT = struct.Struct(FORMAT) # Precompiled, so pack/unpack skip the format cache lookup
+    SIZE = STRUCT.size # Should be 512 bytes
+    MAGIC = b'SDKK'
 
     magic: bytes
     format_version: int
@@ -75,36 +105,52 @@ class SDKKPackageHeader:
     reserved: bytes
     header_checksum: int
 
-    def __post_init__(self):
-        if self.SIZE != 512:
-            raise ValueError(f"SDKKPackageHeader size mismatch: Expected 512, got {self.SIZE}")
-
     def pack(self) -> bytes:
         """Packs the header data into a binary string."""
-        return struct.pack(self.FORMAT,
-                           self.magic,
-                           self.format_version,
-                           self.package_name,
-                           self.package_version_str,
-                           self.package_description,
-                           self.entry_count,
-                           self.entries_table_offset,
-                           self.data_section_offset,
-                           self.data_section_size,
-                           self.data_sha256_hash,
-                           self.reserved,
-                           self.header_checksum)
+        return self.STRUCT.pack(self.magic,
+                                self.format_version,
+                                self.package_name,
+                                self.package_version_str,
+                                self.package_description,
+                                self.entry_count,
+                                self.entries_table_offset,
+                                self.data_section_offset,
+                                self.data_section_size,
+                                self.data_sha256_hash,
+                                self.reserved,
+                                self.header_checksum)
 
     @classmethod
     def unpack(cls, data: bytes):
         """Unpacks a binary string into an SDKKPackageHeader object."""
         if len(data) != cls.SIZE:
             raise ValueError(f"Data size mismatch for SDKKPackageHeader: Expected {cls.SIZE}, got {len(data)}")
-        return cls(*struct.unpack(cls.FORMAT, data))
+        return cls(*cls.STRUCT.unpack(data))
+
+    # Single-field fast paths: cheap pre-validation (e.g., scanning a directory of
+    # .sdkk files) without unpacking all twelve fields into a header object.
+    # 'data' may be longer than the header (e.g., the start of a file or an mmap).
+    @staticmethod
+    def peek_magic(data) -> bytes:
+        """Returns the 4-byte magic at the start of a header."""
+        return bytes(data[:4])
+
+    @classmethod
+    def peek_checksum(cls, data) -> int:
+        """Returns the header_checksum field (the header's last 4 bytes, little-endian)."""
+        if len(data) < cls.SIZE:
+            raise ValueError(f"Data size mismatch for SDKKPackageHeader: Expected at least {cls.SIZE}, got {len(data)}")
+        return int.from_bytes(data[cls.SIZE - 4:cls.SIZE], 'little')
+
+    @classmethod
+    def has_magic(cls, data) -> bool:
+        """True if 'data' starts with the SDKK magic; check this before a full unpack."""
+        return cls.peek_magic(data) == cls.MAGIC
 
 # --- SDKK Module Entry Structure ---
 # This structure precisely mirrors the C `sdkk_module_entry_t` including padding.
-@dataclass
+# slots=True matters here: packages can hold many entries.
+@dataclass(slots=True)
 class SDKKModuleEntry:
     """
     Represents the binary structure of a single module entry within an SDKK package.
@@ -119,7 +165,10 @@ class SDKKModuleEntry:
     # 32s: signature (uint32_t[8] -> 32 bytes)
     # 136s: padding (to reach 256 bytes total: 256 - (64+8+8+4+4+32) = 136)
     FORMAT = "<64sQQII32s136s"
-    SIZE = struct.calcsize(FORMAT) # Should be 256 bytes
+    STRUCT = struct.Struct(FORMAT) # Precompiled, so pack/unpack skip the format cache lookup
+    SIZE = STRUCT.size # Should be 256 bytes
+    # Byte position of the signature within a record (patched in place by the builder)
+    SIGNATURE_POS = 88
 
     name: bytes
     offset: int
@@ -129,27 +178,77 @@ class SDKKModuleEntry:
     signature: bytes
     padding: bytes # Reserved for future use or alignment
 
-    def __post_init__(self):
-        if self.SIZE != 256:
-            raise ValueError(f"SDKKModuleEntry size mismatch: Expected 256, got {self.SIZE}")
-
     def pack(self) -> bytes:
         """Packs the module entry data into a binary string."""
-        return struct.pack(self.FORMAT,
-                           self.name,
-                           self.offset,
-                           self.size,
-                           self.type,
-                           self.flags,
-                           self.signature,
-                           self.padding)
+        return self.STRUCT.pack(self.name,
+                                self.offset,
+                                self.size,
+                                self.type,
+                                self.flags,
+                                self.signature,
+                                self.padding)
+
+    def pack_into(self, buffer, offset: int = 0):
+        """Packs the module entry directly into a writable buffer (e.g., a preallocated bytearray) at 'offset'."""
+        self.STRUCT.pack_into(buffer, offset,
+                              self.name,
+                              self.offset,
+                              self.size,
+                              self.type,
+                              self.flags,
+                              self.signature,
+                              self.padding)
 
     @classmethod
     def unpack(cls, data: bytes):
         """Unpacks a binary string into an SDKKModuleEntry object."""
         if len(data) != cls.SIZE:
             raise ValueError(f"Data size mismatch for SDKKModuleEntry: Expected {cls.SIZE}, got {len(data)}")
-        return cls(*struct.unpack(cls.FORMAT, data))
+        return cls(*cls.STRUCT.unpack(data))
+
+    @classmethod
+    def unpack_many(cls, buffer, count: int, base_offset: int = 0) -> list:
+        """
+        Unpacks 'count' consecutive entries from 'buffer' (e.g., a whole entries
+        table) starting at 'base_offset'. Uses unpack_from, so no per-entry
+        slices are allocated.
+        """
+        end_offset = base_offset + count * cls.SIZE
+        if base_offset < 0 or len(buffer) < end_offset:
+            raise ValueError(f"Data size mismatch for {count} SDKKModuleEntry records: Expected at least {end_offset} bytes, got {len(buffer)}")
+        unpack_from = cls.STRUCT.unpack_from
+        return [cls(*unpack_from(buffer, offset)) for offset in range(base_offset, end_offset, cls.SIZE)]
+
+# The on-disk sizes are fixed by the format; checked once at import instead of per instance
+# (SIGNATURE_POS above must agree with FORMAT as well)
+if SDKKPackageHeader.SIZE != 512:
+    raise ValueError(f"SDKKPackageHeader size mismatch: Expected 512, got {SDKKPackageHeader.SIZE}")
+if SDKKModuleEntry.SIZE != 256:
+    raise ValueError(f"SDKKModuleEntry size mismatch: Expected 256, got {SDKKModuleEntry.SIZE}")
+if struct.calcsize(SDKKModuleEntry.FORMAT[:-len("32s136s")]) != SDKKModuleEntry.SIGNATURE_POS:
+    raise ValueError("SDKKModuleEntry field positions do not match FORMAT")
+
+# --- Write-Only Packing Helpers ---
+# For writers that only need the bytes: packs the fields directly, without
+# constructing a dataclass instance first. Reserved/padding default to zeros.
+_ZERO_HEADER_RESERVED = b"\x00" * 104
+_ZERO_ENTRY_PADDING = b"\x00" * 136
+
+def pack_header(package_name: bytes, package_version_str: bytes, package_description: bytes,
+                entry_count: int, entries_table_offset: int, data_section_offset: int,
+                data_section_size: int, data_sha256_hash: bytes, header_checksum: int = 0,
+                reserved: bytes = _ZERO_HEADER_RESERVED,
+                format_version: int = SDKK_FORMAT_VERSION) -> bytes:
+    """Packs an SDKK package header; equivalent to SDKKPackageHeader(...).pack()."""
+    return SDKKPackageHeader.STRUCT.pack(SDKKPackageHeader.MAGIC, format_version,
+                                         package_name, package_version_str, package_description,
+                                         entry_count, entries_table_offset, data_section_offset,
+                                         data_section_size, data_sha256_hash, reserved, header_checksum)
+
+def pack_entry(name: bytes, offset: int, size: int, type_: int, flags: int, signature: bytes,
+               padding: bytes = _ZERO_ENTRY_PADDING) -> bytes:
+    """Packs one module entry; equivalent to SDKKModuleEntry(...).pack()."""
+    return SDKKModuleEntry.STRUCT.pack(name, offset, size, type_, flags, signature, padding)
 
 # --- Doors SDK Functions (Conceptual User-Space Wrappers / API Stubs) ---
 # These functions represent the API exposed by the Doors OS/Kernel to user-space applications.
@@ -2,16 +2,16 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk, simpledialog
 import os
 import threading
+import traceback
 import queue
 import sys
 import json
-import platform # Added to potentially handle platform specifics
+import hashlib
 
 # Import the improved modules
-# Ensure build_project is imported from builder
-from builder import build_project
+# builder (build_project) and deploy_to_qemu are imported in build()/deploy() on first use,
+# so the window comes up without loading the packaging code
 from syntax_highlighter import CSyntaxHighlighter
-from deploy_to_qemu import deploy_to_qemu
 from dependency_viewer import DependencyViewer
 
 # --- Configuration (Defaults - can be changed in GUI and saved in project) ---
@@ -19,26 +19,65 @@ DEFAULT_OUTPUT_EXTENSION = ".sdkk"
 DEFAULT_SOURCE_EXTENSION = ".c"
 DEFAULT_PROJECT_EXTENSION = ".sdkkproj"
 
-# Suggest platform-specific default paths or relative paths
-if platform.system() == "Windows":
-    DEFAULT_MINGW_PATH = "C:/msys64/mingw64/bin" # Common MinGW-w64 path
-    DEFAULT_KERNEL_ELF_PATH = "kernel.elf" # Assume relative to project or script
-    DEFAULT_BUILD_DIR = "build" # Assume relative to project or script
-elif platform.system() == "Linux":
-    DEFAULT_MINGW_PATH = "/usr/bin" # Or /usr/local/bin, depends on distro/install
-    DEFAULT_KERNEL_ELF_PATH = "kernel.elf"
-    DEFAULT_BUILD_DIR = "build"
-elif platform.system() == "Darwin": # macOS
-    DEFAULT_MINGW_PATH = "/usr/local/bin" # Or wherever brew installs
-    DEFAULT_KERNEL_ELF_PATH = "kernel.elf"
-    DEFAULT_BUILD_DIR = "build"
-else: # Generic fallback
-    DEFAULT_MINGW_PATH = "/usr/bin"
-    DEFAULT_KERNEL_ELF_PATH = "kernel.elf"
-    DEFAULT_BUILD_DIR = "build"
+# Suggest platform-specific default paths or relative paths:
+# sys.platform -> (MinGW bin path, kernel ELF path, build directory).
+# Kernel ELF and build directory are relative to the project or script.
+_PLATFORM_DEFAULT_PATHS = {
+    "win32": ("C:/msys64/mingw64/bin", "kernel.elf", "build"), # Common MinGW-w64 path
+    "linux": ("/usr/bin", "kernel.elf", "build"), # Or /usr/local/bin, depends on distro/install
+    "darwin": ("/usr/local/bin", "kernel.elf", "build"), # macOS; or wherever brew installs
+}
+_FALLBACK_DEFAULT_PATHS = ("/usr/bin", "kernel.elf", "build") # Generic fallback
+DEFAULT_MINGW_PATH, DEFAULT_KERNEL_ELF_PATH, DEFAULT_BUILD_DIR = _PLATFORM_DEFAULT_PATHS.get(sys.platform, _FALLBACK_DEFAULT_PATHS)
 
 
 DEFAULT_APP_SUBDIR = "SysDro/Applications" # Default subdirectory within build dir for apps
+MESSAGE_FLUSH_DELAY_MS = 16 # Queued status/log messages are applied at most once per ~60 Hz frame
+INVALID_ENTRY_BACKGROUND = "#ffe0e0" # Background of a settings field holding an invalid path
+LOG_MAX_LINES = 5000 # Oldest log lines are dropped beyond this, keeping inserts and scrolling cheap
+PROJECT_SAVE_POLL_MS = 50 # How often the main thread checks on a project save running in the background
+
+
+def _file_sizes(paths) -> dict:
+    """
+    Returns {path: size} for the given file paths; missing files are left out.
+    Lists each containing directory once with os.scandir instead of a stat
+    call per path (entry.stat() is free on Windows, where scandir returns it).
+    """
+    by_dir = {}
+    for path in paths:
+        by_dir.setdefault(os.path.dirname(path) or ".", {})[os.path.basename(path)] = path
+
+    sizes = {}
+    for directory, wanted in by_dir.items():
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    path = wanted.pop(entry.name, None)
+                    if path is not None:
+                        try:
+                            sizes[path] = entry.stat().st_size
+                        except OSError:
+                            pass
+        except OSError:
+            continue # Directory is gone, so are its files
+        # Names scandir didn't list verbatim (e.g. different case on Windows): stat them directly
+        for path in wanted.values():
+            try:
+                sizes[path] = os.path.getsize(path)
+            except OSError:
+                pass
+    return sizes
+
+
+def _file_signature(path: str):
+    """Returns (mtime_ns, size) of 'path', or None if it can't be stat'ed."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
 
 class SDKKBuilderGUI:
     """
@@ -55,11 +94,42 @@ class SDKKBuilderGUI:
         self.current_file_path = None
         self.current_project_path = None
         self.content_modified = False
+        self._title_key = None # (file path, project path, modified) the window title was last built from
         self._after_id_editor_change = None # Initialize the after ID to None
+        self._after_id_settings_change = None # Pending _validate_settings call
+        self._good_paths = set() # (check, path) pairs _path_check found valid since the last path edit
+        self._suspend_modified = False # True while _set_editor_text replaces the editor text
+        # Tree item id -> (host path, internal path), in row order. Kept in step with files_tree
+        # so saving/building reads the file list without a Tcl round-trip per row
+        self._files_model = {}
+        self._internal_paths = set() # Internal paths in _files_model, for the duplicate check
+        self._highlight_pending = False # True while the "hl_start"/"hl_end" marks hold an unhighlighted edit span
+        self._editor_line_count = 1
+        self._last_text_hash = None
+        self._edit_serial = 0 # Bumped on every edit by _on_editor_modified
+        self._last_served_serial = -1 # _edit_serial the highlighter/dependencies last saw
+        self._cached_content = None # Editor text as of _cached_content_serial (see _editor_text)
+        self._cached_content_serial = -1
+        self._open_serial = 0 # Bumped per open_file read; results of older reads are discarded
+        self._saved_source_bytes = None # UTF-8 of the text the last _save_content_to_file wrote
 
         # Queue for thread-safe GUI updates
+        # Drained by _flush_queue, which is scheduled once per burst of messages
+        # instead of polling the queue on a timer
         self.message_queue = queue.Queue()
-        self._process_queue() # Start processing queue messages
+        self._flush_lock = threading.Lock()
+        self._flush_scheduled = False
+        self._save_thread = None # Worker thread of the project save in progress, if any
+        self._save_result = None # (path, success, message) left by that thread for _poll_project_save
+        self._pending_project_save = None # (path, project data) of a save requested while one was running
+        self._close_after_save = False # on_closing is waiting for the project save to finish
+        self._last_saved_project = None # (path, JSON text, _file_signature) of the last project write
+        # One long-lived daemon worker runs builds and deploys in click order. It is
+        # a daemon so a running job never keeps the process alive after the window
+        # closes (an interrupted build or deploy is simply abandoned)
+        self._job_queue = queue.Queue()
+        self._build_serial = 0 # Bumped per build; a queued build that is no longer the latest is skipped
+        threading.Thread(target=self._run_jobs, name="sdkk-job", daemon=True).start()
 
         # --- UI Layout ---
         main_frame = tk.Frame(root)
@@ -100,6 +170,7 @@ class SDKKBuilderGUI:
         self._create_settings_widgets(settings_frame)
         self._create_package_details_widgets(package_frame)
         self._create_log_widgets(log_frame) # New log area
+        self._bind_entry_normalization()
 
         # Editor and Dependency Viewer are children of their respective panes
         self.editor = scrolledtext.ScrolledText(editor_frame, wrap="none", undo=True)
@@ -234,6 +305,12 @@ class SDKKBuilderGUI:
         self.app_subdir_entry = tk.Entry(app_subdir_frame, textvariable=self.app_subdir_var, width=60) # Increased width
         self.app_subdir_entry.pack(side="left", fill="x", expand=True, padx=(0, 5))
 
+        # One shared, debounced handler for the path settings, so typing in a
+        # field checks the paths once after a pause instead of on every keystroke
+        for var in (self.mingw_path_var, self.kernel_elf_path_var, self.build_dir_var):
+            var.trace_add("write", self._on_settings_change)
+        self._entry_background = self.mingw_path_entry.cget("background") # Restored once a path is valid again
+
 
     def _create_log_widgets(self, parent_frame):
         """Creates the scrolled text area for build/deploy logs."""
@@ -276,73 +353,211 @@ class SDKKBuilderGUI:
         Handler for editor <<Modified>> event.
         Sets the modified flag and schedules a delayed update for highlighting/dependencies.
         """
-        # The modified flag is set by the Text widget itself when content changes.
-        # We just need to react to it.
+        # The modified flag is set by the Text widget itself when content changes,
+        # and <<Modified>> only fires when it flips. Clearing it re-arms the event for
+        # the next edit; the clear fires it once more with the flag down, which we ignore.
+        if self._suspend_modified or not self.editor.edit_modified():
+            return
+        self.editor.edit_modified(False)
+        self._edit_serial += 1
+
         self.content_modified = True
         self.update_title()
+        self._track_edited_lines()
         # Cancel any previously scheduled _on_editor_change call
         if self._after_id_editor_change is not None:
              self.root.after_cancel(self._after_id_editor_change)
         # Schedule a new call to _on_editor_change after a short delay (e.g., 500ms)
         # This groups rapid typing events into a single update.
-        self._after_id_editor_change = self.root.after(500, self._on_editor_change)
-
-
-    def _on_editor_change(self, event=None):
+        self._after_id_editor_change = self.root.after(500, lambda: self._on_editor_change(incremental=True))
+
+    def _track_edited_lines(self):
+        """Widens the pending highlight span (kept in Tk marks, so it follows later edits) to the edited lines."""
+        line_count = int(self.editor.index("end-1c").split(".")[0])
+        added_lines = max(line_count - self._editor_line_count, 0)
+        self._editor_line_count = line_count
+
+        # A paste leaves the cursor after the inserted block, so reach back over the lines it added
+        start = self.editor.index(f"insert linestart - {added_lines} lines")
+        end = self.editor.index("insert lineend")
+        if self._highlight_pending:
+            if self.editor.compare("hl_start", "<", start):
+                start = "hl_start"
+            if self.editor.compare("hl_end", ">", end):
+                end = "hl_end"
+        self.editor.mark_set("hl_start", start)
+        self.editor.mark_set("hl_end", end)
+        self.editor.mark_gravity("hl_start", tk.LEFT)
+        self.editor.mark_gravity("hl_end", tk.RIGHT)
+        self._highlight_pending = True
+
+
+    def _on_editor_change(self, event=None, incremental: bool = False):
         """
         Performs highlighting and dependency updates.
-        Called after a delay from _on_editor_modified or manually after loading/saving.
-        Resets the modified flag after processing.
+        Called after a delay from _on_editor_modified (incremental=True: only the edited
+        lines are re-highlighted and the unsaved-changes flag is kept), or manually after
+        loading/saving (full highlight, resets the modified flag).
         """
-        # Ensure the modified flag is reset *before* getting text to avoid re-triggering <<Modified>>
-        # This is the crucial change: edit_reset() is here, not in _on_editor_modified
-        self.editor.edit_reset()
-        self.content_modified = False # Explicitly set flag to False after reset
-        self.update_title() # Update title to remove '*'
+        if not incremental:
+            # Text was replaced or written out; any pending edit span is moot.
+            # The undo history is left alone: edit_reset() would discard it on every change.
+            if self._after_id_editor_change is not None:
+                self.root.after_cancel(self._after_id_editor_change)
+            self.editor.edit_modified(False)
+            self.content_modified = False
+            self.update_title() # Update title to remove '*'
+            self._editor_line_count = int(self.editor.index("end-1c").split(".")[0])
+
+        # Clear the stored after ID since the scheduled call has now run (or was cancelled)
+        self._after_id_editor_change = None
+        highlight_pending, self._highlight_pending = self._highlight_pending, False
+
+        # No edit since the last update (e.g. the refresh after a save): don't even
+        # copy the buffer out of Tk, let alone hash, highlight or parse it
+        if self._edit_serial == self._last_served_serial:
+            return
+        self._last_served_serial = self._edit_serial
+
+        # One copy of the buffer (without Tk's trailing newline), shared by both consumers.
+        # If the buffer is back to what was last processed (e.g. an undone edit) the
+        # dependency list is still current, but highlighting is not: undo re-inserts
+        # text without its tags
+        text_content = self._editor_text()
+        text_hash = hashlib.blake2b(text_content.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+        dependencies_current = text_hash == self._last_text_hash
+        self._last_text_hash = text_hash
 
         # Perform the actual updates
-        text_content = self.editor.get("1.0", tk.END)
-        self.highlighter.highlight()
-        self.dependency_viewer.update_dependencies(text_content)
+        if incremental and highlight_pending:
+            self.highlighter.highlight_range("hl_start", "hl_end")
+            if dependencies_current:
+                return
+            # Typing in code below the last #include/DRO_MODULE can't change the dependency list
+            edit_first_line = int(self.editor.index("hl_start").split(".")[0])
+            if not self.dependency_viewer.affects_dependencies(edit_first_line, self.editor.get("hl_start", "hl_end")):
+                return
+        else:
+            self.highlighter.highlight(text_content=text_content)
+            if dependencies_current:
+                return
+        # This call is already debounced by _on_editor_modified, so parse right away
+        self.dependency_viewer.update_dependencies(text_content, delay_ms=0)
 
-        # Clear the stored after ID since the scheduled call has now run
-        self._after_id_editor_change = None
+
+    def _editor_text(self) -> str:
+        """
+        Returns the editor text without the extra newline that text.get(..., END) adds.
+        The copy out of Tk is reused until the next edit (_edit_serial), so saving,
+        building and the change handler share one copy of an unchanged buffer.
+        """
+        if self._cached_content is None or self._cached_content_serial != self._edit_serial:
+            self._cached_content = self.editor.get("1.0", "end-1c")
+            self._cached_content_serial = self._edit_serial
+        return self._cached_content
+
+    def _editor_has_content(self) -> bool:
+        """
+        Returns True if the editor holds anything but whitespace. Tk searches its own
+        buffer and stops at the first such character, so nothing is copied out.
+        """
+        return bool(self.editor.search(r"\S", "1.0", "end-1c", regexp=True))
+
+    def _set_editor_text(self, content: str):
+        """
+        Replaces the editor text without it counting as a user edit: no <<Modified>>
+        handling, no debounced update. The caller runs _on_editor_change once afterwards.
+        """
+        self._suspend_modified = True
+        self._edit_serial += 1 # New text for _editor_text and _on_editor_change, though not a user edit
+        try:
+            self.editor.delete("1.0", tk.END)
+            if content:
+                self.editor.insert("1.0", content)
+            # Also covers a <<Modified>> event Tk queued for later delivery
+            self.editor.edit_modified(False)
+            # A new document starts a new undo history (undo must not bring back the old file)
+            self.editor.edit_reset()
+        finally:
+            self._suspend_modified = False
 
 
     def update_status(self, message: str):
         """Updates the text in the status bar. Thread-safe."""
         # Put message in queue to be processed by the main thread
-        self.message_queue.put(("status", message))
+        self._post_message(("status", message))
 
     def log_message(self, message: str, tag: str = "info"):
         """Appends a message to the log area. Thread-safe."""
         # Put message in queue to be processed by the main thread
-        self.message_queue.put(("log", message, tag))
-
-    def _process_queue(self):
-        """Processes messages from the queue in the main thread."""
-        while not self.message_queue.empty():
+        self._post_message(("log", message, tag))
+
+    def _post_message(self, message: tuple):
+        """Queues a message and schedules a flush on the main thread unless one is already pending. Thread-safe."""
+        self.message_queue.put(message)
+        with self._flush_lock:
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        try:
+            # after() may be called from worker threads; tkinter hands it to the Tcl thread.
+            # Waiting one frame lets a burst of build output share a single flush.
+            self.root.after(MESSAGE_FLUSH_DELAY_MS, self._flush_queue)
+        except (RuntimeError, tk.TclError):
+            pass # Window already destroyed
+
+    def _flush_queue(self):
+        """Processes all queued messages in the main thread with one log widget update."""
+        # Clear the flag first so messages posted while draining schedule another flush
+        with self._flush_lock:
+            self._flush_scheduled = False
+
+        status = None
+        log_runs = [] # [tag, [lines]] per run of consecutive messages with the same tag
+        while True:
             try:
                 msg_type, *args = self.message_queue.get_nowait()
-                if msg_type == "status":
-                    message = args[0]
-                    self.status_bar.config(text=message)
-                elif msg_type == "log":
-                    message, tag = args
-                    self.log_text.config(state="normal")
-                    self.log_text.insert(tk.END, message + "\n", tag)
-                    self.log_text.see(tk.END) # Auto-scroll to the end
-                    self.log_text.config(state="disabled")
             except queue.Empty:
-                pass # Should not happen with get_nowait() and while loop
-            except Exception as e:
-                print(f"Error processing message queue: {e}")
-        # Schedule the next check
-        self.root.after(100, self._process_queue)
+                break
+            if msg_type == "status":
+                status = args[0] # Only the latest status is ever visible
+            elif msg_type == "log":
+                message, tag = args
+                if not log_runs or log_runs[-1][0] != tag:
+                    log_runs.append([tag, []])
+                log_runs[-1][1].append(message + "\n")
+
+        try:
+            if status is not None:
+                self.status_bar.config(text=status)
+            if log_runs:
+                # One insert for everything: Text.insert takes alternating text, tag arguments
+                insert_args = []
+                for tag, lines in log_runs:
+                    insert_args += ("".join(lines), tag)
+                # Only follow new output if the user hasn't scrolled up to read older lines
+                at_bottom = self.log_text.yview()[1] >= 1.0
+                self.log_text.config(state="normal")
+                self.log_text.insert(tk.END, *insert_args)
+                # Every message ends with a newline, so the last line is the empty one after it
+                excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - LOG_MAX_LINES
+                if excess > 0:
+                    self.log_text.delete("1.0", f"{excess + 1}.0")
+                if at_bottom:
+                    self.log_text.see(tk.END) # Auto-scroll to the end
+                self.log_text.config(state="disabled")
+        except Exception as e:
+            print(f"Error processing message queue: {e}")
 
 
     def update_title(self):
         """Updates the window title based on the current file/project and modification status."""
+        # Called on every edit; only talk to the window manager when the title would change
+        title_key = (self.current_file_path, self.current_project_path, self.content_modified)
+        if title_key == self._title_key:
+            return
+        self._title_key = title_key
+
         project_name = os.path.basename(self.current_project_path) if self.current_project_path else "Untitled Project"
         file_name = os.path.basename(self.current_file_path) if self.current_file_path else "No Source File"
         modified_indicator = "*" if self.content_modified else ""
@@ -362,7 +577,9 @@ class SDKKBuilderGUI:
             if response is True: # Yes, save
                 # If a project is open, saving the project should save the source file
                 # If no project, just save the source file
-                save_success = self.save_project() if self.current_project_path else self.save_file()
+                # The caller acts on the result (e.g. closes the window), so the project
+                # is written synchronously and a failure is shown in a dialog
+                save_success = self.save_project(wait=True) if self.current_project_path else self.save_file()
                 return save_success # Proceed only if save was successful
             elif response is False: # No, discard
                 return True # Proceed without saving
@@ -373,7 +590,26 @@ class SDKKBuilderGUI:
     def on_closing(self):
         """Handles the window closing event, checking for unsaved changes."""
         if self._check_unsaved_changes():
-            self.root.destroy()
+            if self._save_thread is not None:
+                # Don't let interpreter exit kill a project save that is still writing;
+                # _poll_project_save closes the window once it (and any queued save) is done
+                self._close_after_save = True
+                self.update_status("Waiting for the project save to finish...")
+                return
+            self._close_window()
+
+    def _close_window(self):
+        """Shuts down background work that must not outlive the window and destroys it."""
+        # Drop queued jobs and stop the worker after the running one (if any); as a
+        # daemon it does not delay exit, and its result hand-off to the destroyed
+        # window is ignored by _call_in_main_thread
+        while True:
+            try:
+                self._job_queue.get_nowait()
+            except queue.Empty:
+                break
+        self._job_queue.put(None)
+        self.root.destroy()
 
     # --- Project Management ---
 
@@ -386,7 +622,7 @@ class SDKKBuilderGUI:
             self.content_modified = False
 
             # Clear UI fields
-            self.editor.delete("1.0", tk.END)
+            self._set_editor_text("")
             self.package_name_var.set("MyApplication")
             self.package_version_var.set("1.0")
             self.package_description_var.set("A sample Doors application")
@@ -399,8 +635,7 @@ class SDKKBuilderGUI:
             self.app_subdir_var.set(DEFAULT_APP_SUBDIR)
 
             # Clear files tree
-            for item in self.files_tree.get_children():
-                self.files_tree.delete(item)
+            self._clear_package_files()
 
             self.update_title()
             self.update_status("New project created.")
@@ -425,8 +660,9 @@ class SDKKBuilderGUI:
             return
 
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                project_data = json.load(f)
+            # Read the file in one go; json.loads decodes the UTF-8 bytes itself
+            with open(path, "rb") as f:
+                project_data = json.loads(f.read())
 
             self.current_project_path = path
 
@@ -449,18 +685,18 @@ class SDKKBuilderGUI:
             self.app_subdir_var.set(deploy_settings.get("app_subdirectory", DEFAULT_APP_SUBDIR))
 
             # Load additional files
-            for item in self.files_tree.get_children():
-                self.files_tree.delete(item)
-            for file_info in project_data.get("additional_files", []):
-                 host_path = file_info.get("host_path")
-                 internal_path = file_info.get("internal_path")
-                 if host_path and internal_path:
-                     try:
-                         file_size = os.path.getsize(host_path)
-                         self.files_tree.insert("", tk.END, values=(host_path, internal_path, file_size))
-                     except OSError:
-                         self.files_tree.insert("", tk.END, values=(host_path, internal_path, "Missing!"))
-                         self.update_status(f"Warning: File '{os.path.basename(host_path)}' not found.")
+            self._clear_package_files()
+            file_rows = [(file_info.get("host_path"), file_info.get("internal_path"))
+                         for file_info in project_data.get("additional_files", [])]
+            file_rows = [(host_path, internal_path) for host_path, internal_path in file_rows if host_path and internal_path]
+            file_sizes = _file_sizes(host_path for host_path, _ in file_rows)
+            for host_path, internal_path in file_rows:
+                 file_size = file_sizes.get(host_path)
+                 if file_size is not None:
+                     self._add_package_file_row(host_path, internal_path, file_size)
+                 else:
+                     self._add_package_file_row(host_path, internal_path, "Missing!")
+                     self.update_status(f"Warning: File '{os.path.basename(host_path)}' not found.")
 
             # Load main source file
             main_source_file_path = project_data.get("main_source_file")
@@ -468,22 +704,21 @@ class SDKKBuilderGUI:
                 try:
                     with open(main_source_file_path, "r", encoding="utf-8") as f:
                         content = f.read()
-                        self.editor.delete("1.0", tk.END)
-                        self.editor.insert("1.0", content)
+                        self._set_editor_text(content)
                         self.current_file_path = main_source_file_path
                         self.update_status(f"Opened project and source file: {os.path.basename(main_source_file_path)}")
                 except Exception as e:
                     messagebox.showwarning("Error Loading Source File", f"Could not load main source file '{main_source_file_path}' specified in project:\n{e}")
-                    self.editor.delete("1.0", tk.END)
+                    self._set_editor_text("")
                     self.current_file_path = None
                     self.update_status(f"Opened project, but failed to load source file.")
             elif main_source_file_path:
                  messagebox.showwarning("Source File Missing", f"Main source file '{main_source_file_path}' specified in project was not found.")
-                 self.editor.delete("1.0", tk.END)
+                 self._set_editor_text("")
                  self.current_file_path = None
                  self.update_status(f"Opened project, but main source file is missing.")
             else:
-                 self.editor.delete("1.0", tk.END)
+                 self._set_editor_text("")
                  self.current_file_path = None
                  self.update_status(f"Opened project. No main source file specified.")
 
@@ -496,20 +731,24 @@ class SDKKBuilderGUI:
             self.update_status(f"Error opening project file.")
 
 
-    def save_project(self) -> bool:
-        """Saves the current project settings and source file. Returns True on success."""
+    def save_project(self, wait: bool = False) -> bool:
+        """
+        Saves the current project settings and source file. Returns True on success.
+        The project file is written in the background unless wait is True; the result
+        is then only known (and True) for a synchronous save.
+        """
         if not self.current_project_path:
             return self.save_project_as()
 
         # If editor has content but no file path, force Save As for the source file first
-        editor_content = self.editor.get("1.0", tk.END).strip()
-        if editor_content and not self.current_file_path:
+        has_content = self._editor_has_content()
+        if has_content and not self.current_file_path:
              messagebox.showwarning("Cannot Save Project", "Please save the main source file first or specify its path.")
              if not self.save_file_as():
                   self.update_status("Project save cancelled (source file not saved).")
                   return False
         # If editor is empty and no file path, just save the project settings
-        elif not editor_content and not self.current_file_path:
+        elif not has_content and not self.current_file_path:
              pass # OK to save project without a main source file
         # If editor has content and a file path, save the source file if modified
         elif self.current_file_path and self.content_modified:
@@ -536,28 +775,101 @@ class SDKKBuilderGUI:
                 "kernel_elf_path": self.kernel_elf_path_var.get().strip(),
                 "app_subdirectory": self.app_subdir_var.get().strip()
             },
-            "additional_files": []
+            # Read from the Python-side mirror of the tree: no Tcl call per row
+            "additional_files": [{"host_path": host_path, "internal_path": internal_path}
+                                 for host_path, internal_path in self._files_model.values()]
         }
 
-        for item_id in self.files_tree.get_children():
-            host_path, internal_path, _ = self.files_tree.item(item_id, 'values')
-            project_data["additional_files"].append({
-                "host_path": host_path,
-                "internal_path": internal_path
-            })
-
+        # Write in a worker thread so the UI doesn't wait on the disk. Saves are kept
+        # in order: one requested while another is running starts after it, and only
+        # the newest such request is kept since it supersedes the older ones.
+        self.update_title()
+        if wait:
+            # Background saves hold older data: let a running one land first and drop a
+            # queued one. Joining is safe because the worker never calls into Tk.
+            self._pending_project_save = None
+            if self._save_thread is not None:
+                self._save_thread.join()
+                self._poll_project_save()
+            success, message = self._write_project_file(self.current_project_path, project_data)
+            self._report_project_save(self.current_project_path, success, message)
+            if not success:
+                messagebox.showerror("Error Saving Project", message)
+            return success
+
+        self.update_status(f"Saving project: {os.path.basename(self.current_project_path)}...")
+        if self._save_thread is not None:
+            self._pending_project_save = (self.current_project_path, project_data)
+        else:
+            self._start_project_save(self.current_project_path, project_data)
+        return True # Optimistic; a failed write is reported in the log
+
+    def _start_project_save(self, path: str, project_data: dict):
+        """Starts writing the project file in a worker thread, watched by _poll_project_save."""
+        def run_save():
+            # No Tk calls (status/log included) from this thread: the result is
+            # reported by _poll_project_save on the main thread
+            self._save_result = (path, *self._write_project_file(path, project_data))
+        self._save_thread = threading.Thread(target=run_save, daemon=True)
+        self._save_thread.start()
+        self.root.after(PROJECT_SAVE_POLL_MS, self._poll_project_save)
+
+    def _poll_project_save(self):
+        """Reports a finished project save (main GUI thread) and starts the queued one, if any."""
+        if self._save_thread is None:
+            return
+        if self._save_thread.is_alive():
+            self.root.after(PROJECT_SAVE_POLL_MS, self._poll_project_save)
+            return
+        self._save_thread = None
+        path, success, message = self._save_result
+        self._report_project_save(path, success, message)
+        if self._pending_project_save is not None:
+            pending, self._pending_project_save = self._pending_project_save, None
+            self._start_project_save(*pending)
+        elif self._close_after_save:
+            self._close_window()
+
+    def _write_project_file(self, path: str, project_data: dict) -> tuple[bool, str]:
+        """
+        Writes the project file atomically: the data goes to a temporary file that is
+        flushed to disk and then renamed over 'path', so a crash mid-write leaves the
+        previous project file intact. Makes no Tk calls, so it can run in a worker
+        thread. Returns (success, status or error message).
+        """
+        temp_path = f"{path}.tmp"
         try:
-            with open(self.current_project_path, "w", encoding="utf-8") as f:
-                json.dump(project_data, f, indent=4)
-
-            self.update_title()
-            self.update_status(f"Project saved: {os.path.basename(self.current_project_path)}")
-            return True
+            # Serialize first and write once; json.dump would call f.write for every
+            # small chunk the encoder yields
+            project_json = json.dumps(project_data, indent=4)
+
+            # Saving an unchanged project (Save again, or Save before a build) writes and
+            # syncs nothing, provided the file on disk is still the one last written here
+            if self._last_saved_project == (path, project_json, _file_signature(path)):
+                return True, f"Project saved (no changes): {os.path.basename(path)}"
+
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(project_json)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+            self._last_saved_project = (path, project_json, _file_signature(path))
+            return True, f"Project saved: {os.path.basename(path)}"
 
         except Exception as e:
-            messagebox.showerror("Error Saving Project", f"Could not save project file:\n{e}")
-            self.update_status(f"Error saving project file: {os.path.basename(self.current_project_path)}")
-            return False
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return False, f"Could not save project file '{path}': {e}"
+
+    def _report_project_save(self, path: str, success: bool, message: str):
+        """Shows the outcome of a _write_project_file call (main GUI thread)."""
+        if success:
+            self.update_status(message)
+        else:
+            self.log_message(message, "error")
+            self.update_status(f"Error saving project file: {os.path.basename(path)}")
 
 
     def save_project_as(self) -> bool:
@@ -576,7 +888,7 @@ class SDKKBuilderGUI:
     def new_file(self):
         """Creates a new source file in the editor. Prompts to save current editor content if modified."""
         if self._check_unsaved_changes():
-            self.editor.delete("1.0", tk.END)
+            self._set_editor_text("")
             self.current_file_path = None
             self.content_modified = False
             self.update_title()
@@ -596,19 +908,48 @@ class SDKKBuilderGUI:
             filetypes=[("C Source Files", f"*{DEFAULT_SOURCE_EXTENSION}"), ("All Files", "*.*")]
         )
         if path:
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    self.editor.delete("1.0", tk.END)
-                    self.editor.insert("1.0", content)
-                    self.current_file_path = path
-                    self.update_status(f"Opened source file: {os.path.basename(path)}")
-                    # Update highlighting/dependencies and reset modified flag
-                    self._on_editor_change()
-
-            except Exception as e:
-                messagebox.showerror("Error Opening File", f"Could not open file:\n{e}")
-                self.update_status(f"Error opening file: {os.path.basename(path)}")
+            self.update_status(f"Opening source file: {os.path.basename(path)}...")
+
+            # Read in a separate thread so a slow disk or network share doesn't freeze
+            # the window; the editor itself is only touched back in the main thread.
+            # The editor stays usable meanwhile, so the result is only applied if this
+            # is still the latest open and nothing was edited since (see _handle_opened_file)
+            self._open_serial += 1
+            open_serial, edit_serial = self._open_serial, self._edit_serial
+            def read_file_in_thread():
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        content = f.read()
+                except Exception as e:
+                    self.root.after(0, self._handle_open_file_error, path, e, open_serial)
+                    return
+                self.root.after(0, self._handle_opened_file, path, content, open_serial, edit_serial)
+
+            threading.Thread(target=read_file_in_thread, daemon=True).start()
+
+    def _handle_opened_file(self, path: str, content: str, open_serial: int, edit_serial: int):
+        """
+        Puts a source file read by open_file into the editor (main GUI thread), unless a
+        later open_file superseded it or the editor was changed while it was being read.
+        """
+        if open_serial != self._open_serial:
+            return
+        if edit_serial != self._edit_serial:
+            self.update_status(f"Open cancelled: {os.path.basename(path)}")
+            self.log_message(f"Did not open '{path}': the editor was changed while the file was loading.", "warning")
+            return
+        self._set_editor_text(content)
+        self.current_file_path = path
+        self.update_status(f"Opened source file: {os.path.basename(path)}")
+        # Update highlighting/dependencies and reset modified flag
+        self._on_editor_change()
+
+    def _handle_open_file_error(self, path: str, error: Exception, open_serial: int):
+        """Reports a source file open_file could not read (main GUI thread), unless superseded."""
+        if open_serial != self._open_serial:
+            return
+        messagebox.showerror("Error Opening File", f"Could not open file:\n{error}")
+        self.update_status(f"Error opening file: {os.path.basename(path)}")
 
     def save_file(self) -> bool:
         """Saves the current editor content to the current source file path. Returns True on success."""
@@ -634,11 +975,11 @@ class SDKKBuilderGUI:
         """Helper function to save content to a given path. Returns True on success."""
         try:
             with open(path, "w", encoding="utf-8") as f:
-                content = self.editor.get("1.0", tk.END)
-                # Remove the extra newline that text.get(..., END) adds
-                if content.endswith('\n'):
-                    content = content[:-1]
+                content = self._editor_text()
                 f.write(content)
+            # Kept for the compile cache key of a build right after the save, so
+            # build_project does not read the file back (newlines stay untranslated)
+            self._saved_source_bytes = content.encode("utf-8")
             self.update_status(f"Saved: {os.path.basename(path)}")
             # Update highlighting/dependencies and reset modified flag after saving
             self._on_editor_change()
@@ -653,9 +994,9 @@ class SDKKBuilderGUI:
         """Opens a dialog to select a file to add to the package list."""
         path = filedialog.askopenfilename(title="Select File to Add to Package")
         if path:
-            initial_internal_path = os.path.basename(path)
+            file_name = os.path.basename(path) # Also the initial internal path
             # Prompt user for internal path
-            internal_path = simpledialog.askstring("Internal Path", f"Enter internal path for '{os.path.basename(path)}':", initialvalue=initial_internal_path)
+            internal_path = simpledialog.askstring("Internal Path", f"Enter internal path for '{file_name}':", initialvalue=file_name)
 
             if internal_path is not None: # User didn't cancel
                 internal_path = internal_path.strip().replace("\\", "/") # Normalize slashes and strip whitespace
@@ -665,19 +1006,30 @@ class SDKKBuilderGUI:
                      return
 
                 # Check for duplicate internal paths
-                for item_id in self.files_tree.get_children():
-                    item_values = self.files_tree.item(item_id, 'values')
-                    if item_values[1] == internal_path:
-                        messagebox.showwarning("Duplicate Internal Path", f"An item with internal path '{internal_path}' already exists.")
-                        return
+                if internal_path in self._internal_paths:
+                    messagebox.showwarning("Duplicate Internal Path", f"An item with internal path '{internal_path}' already exists.")
+                    return
 
                 try:
                     file_size = os.path.getsize(path)
-                    self.files_tree.insert("", tk.END, values=(path, internal_path, file_size))
-                    self.update_status(f"Added '{os.path.basename(path)}' to package files.")
+                    self._add_package_file_row(path, internal_path, file_size)
+                    self.update_status(f"Added '{file_name}' to package files.")
                 except OSError as e:
                     messagebox.showerror("Error Adding File", f"Could not get size of file '{path}': {e}")
-                    self.update_status(f"Error adding file: {os.path.basename(path)}")
+                    self.update_status(f"Error adding file: {file_name}")
+
+
+    def _add_package_file_row(self, host_path: str, internal_path: str, size):
+        """Appends a row to the files tree and to its Python-side mirror, _files_model."""
+        item_id = self.files_tree.insert("", tk.END, values=(host_path, internal_path, size))
+        self._files_model[item_id] = (host_path, internal_path)
+        self._internal_paths.add(internal_path)
+
+    def _clear_package_files(self):
+        """Removes all rows from the files tree and its mirror."""
+        self.files_tree.delete(*self._files_model)
+        self._files_model.clear()
+        self._internal_paths.clear()
 
 
     def remove_selected_file(self):
@@ -689,23 +1041,95 @@ class SDKKBuilderGUI:
 
         if messagebox.askyesno("Remove Files", f"Are you sure you want to remove {len(selected_items)} selected file(s)?"):
             for item_id in selected_items:
-                item_values = self.files_tree.item(item_id, 'values')
-                file_name = os.path.basename(item_values[0])
+                host_path, internal_path = self._files_model.pop(item_id)
+                self._internal_paths.discard(internal_path)
+                file_name = os.path.basename(host_path)
                 self.files_tree.delete(item_id)
                 self.update_status(f"Removed '{file_name}' from package files.")
 
 
+    # --- Settings Validation ---
+    def _on_settings_change(self, *args):
+        """trace_add callback for the path settings: (re)schedules one _validate_settings call."""
+        self._good_paths.clear() # A path changed; check everything afresh
+        if self._after_id_settings_change is not None:
+            self.root.after_cancel(self._after_id_settings_change)
+        self._after_id_settings_change = self.root.after(500, self._validate_settings)
+
+    def _bind_entry_normalization(self):
+        """Strips surrounding whitespace from each settings field once, when it loses focus."""
+        def strip_var(event, var):
+            value = var.get()
+            if value != value.strip():
+                var.set(value.strip())
+
+        for entry, var in ((self.package_name_entry, self.package_name_var),
+                           (self.package_version_entry, self.package_version_var),
+                           (self.package_description_entry, self.package_description_var),
+                           (self.entry_point_entry, self.entry_point_var),
+                           (self.mingw_path_entry, self.mingw_path_var),
+                           (self.kernel_elf_path_entry, self.kernel_elf_path_var),
+                           (self.build_dir_entry, self.build_dir_var),
+                           (self.app_subdir_entry, self.app_subdir_var)):
+            entry.bind("<FocusOut>", lambda event, v=var: strip_var(event, v))
+
+    def _path_check(self, check, path: str) -> bool:
+        """
+        Returns check(path) for a settings path (check is os.path.isdir/isfile/exists).
+        Positive answers are remembered until a path setting is edited, so build, deploy
+        and validation don't stat the same unchanged paths again. Failures are always
+        re-checked: the file may appear (e.g. a freshly built kernel) without an edit here.
+        """
+        key = (check, path)
+        if key in self._good_paths:
+            return True
+        ok = check(path)
+        if ok:
+            self._good_paths.add(key)
+        return ok
+
+    def _validate_settings(self):
+        """
+        Checks all path settings in one pass, tints invalid fields and reports
+        problems in the status bar.
+        """
+        self._after_id_settings_change = None
+        problems = []
+        mingw_path = self.mingw_path_var.get().strip()
+        mingw_ok = not mingw_path or self._path_check(os.path.isdir, mingw_path)
+        if not mingw_ok:
+            problems.append("MinGW Bin Path is not a directory")
+        kernel_elf_path = self.kernel_elf_path_var.get().strip()
+        kernel_ok = not kernel_elf_path or self._path_check(os.path.isfile, kernel_elf_path)
+        if not kernel_ok:
+            problems.append("Kernel ELF not found")
+        build_dir = self.build_dir_var.get().strip()
+        # A missing build directory is created by the build; only a file in its place is a problem
+        build_dir_ok = not build_dir or not self._path_check(os.path.exists, build_dir) or self._path_check(os.path.isdir, build_dir)
+        if not build_dir_ok:
+            problems.append("Build Directory is not a directory")
+
+        for entry, ok in ((self.mingw_path_entry, mingw_ok),
+                          (self.kernel_elf_path_entry, kernel_ok),
+                          (self.build_dir_entry, build_dir_ok)):
+            entry.configure(background=self._entry_background if ok else INVALID_ENTRY_BACKGROUND)
+        if problems:
+            self.update_status(f"Warning: {'; '.join(problems)}.")
+
+
     # --- Browse Button Handlers ---
     def browse_mingw_path(self):
         """Opens a dialog to select the MinGW bin directory."""
-        initial_dir = self.mingw_path_var.get() if os.path.isdir(self.mingw_path_var.get()) else "."
+        mingw_path = self.mingw_path_var.get()
+        initial_dir = mingw_path if self._path_check(os.path.isdir, mingw_path) else "."
         directory = filedialog.askdirectory(title="Select MinGW Bin Directory", initialdir=initial_dir)
         if directory:
             self.mingw_path_var.set(os.path.normpath(directory))
 
     def browse_kernel_elf_path(self):
         """Opens a dialog to select the Kernel ELF file."""
-        initial_dir = os.path.dirname(self.kernel_elf_path_var.get()) if os.path.exists(self.kernel_elf_path_var.get()) else "."
+        kernel_elf_path = self.kernel_elf_path_var.get()
+        initial_dir = os.path.dirname(kernel_elf_path) if self._path_check(os.path.exists, kernel_elf_path) else "."
         path = filedialog.askopenfilename(
             title="Select Kernel ELF File",
             filetypes=[("ELF Files", "*.elf"), ("All Files", "*.*")],
@@ -716,7 +1140,8 @@ class SDKKBuilderGUI:
 
     def browse_build_dir(self):
         """Opens a dialog to select the Build Directory."""
-        initial_dir = self.build_dir_var.get() if os.path.isdir(self.build_dir_var.get()) else "."
+        build_dir = self.build_dir_var.get()
+        initial_dir = build_dir if self._path_check(os.path.isdir, build_dir) else "."
         directory = filedialog.askdirectory(title="Select Build Directory", initialdir=initial_dir)
         if directory:
             self.build_dir_var.set(os.path.normpath(directory))
@@ -732,17 +1157,18 @@ class SDKKBuilderGUI:
         self.log_text.config(state="disabled")
         self.log_message("--- Build Started ---")
 
-        editor_content = self.editor.get("1.0", tk.END).strip()
+        has_content = self._editor_has_content()
+        self._saved_source_bytes = None
 
         # --- Validation ---
-        if not editor_content and not self.current_file_path:
+        if not has_content and not self.current_file_path:
              messagebox.showinfo("No Source Code", "The editor is empty and no source file is open. Nothing to build.")
              self.update_status("Build cancelled (no source code).")
              self.log_message("Build cancelled: No source code.", "warning")
              return
 
         # If editor has content but no file path, force Save As for the source file first
-        if editor_content and not self.current_file_path:
+        if has_content and not self.current_file_path:
              messagebox.showinfo("Save Source File", "Please save the main source file before building.")
              if not self.save_file_as():
                   self.update_status("Build cancelled (source file not saved).")
@@ -755,7 +1181,9 @@ class SDKKBuilderGUI:
                   self.log_message("Build cancelled: Failed to save source file.", "error")
                   return
 
-        # Now we are sure self.current_file_path is set and saved if needed
+        # Now we are sure self.current_file_path is set and saved if needed.
+        # If it was saved just now, build_project gets the written bytes too
+        source_bytes = self._saved_source_bytes
 
         package_name = self.package_name_var.get().strip()
         package_version = self.package_version_var.get().strip()
@@ -793,7 +1221,7 @@ class SDKKBuilderGUI:
         entry = self.entry_point_var.get().strip()
         mingw_path = self.mingw_path_var.get().strip()
 
-        if not mingw_path or not os.path.isdir(mingw_path):
+        if not mingw_path or not self._path_check(os.path.isdir, mingw_path):
              messagebox.showerror("Build Error", "MinGW Bin Path is not set or is not a valid directory.")
              self.update_status("Build failed (MinGW path invalid).")
              self.log_message("Build failed: MinGW Bin Path is invalid.", "error")
@@ -807,10 +1235,11 @@ class SDKKBuilderGUI:
 
         # Collect additional files list from the Treeview
         additional_files_list = []
-        for item_id in self.files_tree.get_children():
-            host_path, internal_path, size_str = self.files_tree.item(item_id, 'values')
-            # Check if host file exists before adding to the list for the builder
-            if not os.path.exists(host_path):
+        # Check that host files exist before adding them to the list for the builder,
+        # with one directory listing per directory rather than a stat per file
+        existing_files = _file_sizes(host_path for host_path, _ in self._files_model.values())
+        for host_path, internal_path in self._files_model.values():
+            if host_path not in existing_files:
                  self.log_message(f"Warning: Additional file '{os.path.basename(host_path)}' not found. Skipping.", "warning")
                  continue # Skip this file
             additional_files_list.append((host_path, internal_path))
@@ -819,8 +1248,15 @@ class SDKKBuilderGUI:
         self.update_status(f"Starting full build for package '{package_name}'...")
         self.log_message(f"Starting full build for package '{package_name}'...")
 
+        # Import before starting the thread (once; later calls hit sys.modules)
+        from builder import build_project
+
         # Run build in a separate thread
+        self._build_serial += 1
+        build_serial = self._build_serial
         def run_build_in_thread():
+            if build_serial != self._build_serial:
+                return # A newer build was queued while this one waited for the worker
             print("DEBUG: run_build_in_thread() started") # Debug print
             # Pass the log_message method as the progress_callback
             success, log = build_project(
@@ -833,20 +1269,44 @@ class SDKKBuilderGUI:
                 arch=arch,
                 entry=entry,
                 mingw_path=mingw_path,
-                progress_callback=self.log_message # Use log_message for detailed output
+                progress_callback=self.log_message, # Use log_message for detailed output
+                source_bytes=source_bytes
             )
-            # Use root.after to call the result handler in the main GUI thread
-            self.root.after(0, self._handle_build_result, success, log, output_sdkk_path)
+            # Call the result handler in the main GUI thread
+            self._call_in_main_thread(self._handle_build_result, success, log, output_sdkk_path)
 
-        threading.Thread(target=run_build_in_thread, daemon=True).start()
+        self._submit_job(run_build_in_thread)
 
 
+    def _submit_job(self, job):
+        """Queues job on the build/deploy worker."""
+        self._job_queue.put(job)
+
+    def _run_jobs(self):
+        """Worker loop: runs queued jobs one at a time until _close_window posts None."""
+        while True:
+            job = self._job_queue.get()
+            if job is None:
+                return
+            try:
+                job()
+            except Exception:
+                traceback.print_exc() # Keep the worker alive for the next job
+
+    def _call_in_main_thread(self, callback, *args):
+        """Schedules callback(*args) on the main thread; a no-op once the window is destroyed."""
+        try:
+            self.root.after(0, callback, *args)
+        except (RuntimeError, tk.TclError):
+            pass # Window already destroyed
+
     def _handle_build_result(self, success: bool, log: str, output_sdkk_path: str):
         """Handles the result of the build process in the main GUI thread."""
         self.log_message("--- Build Finished ---")
         if success:
-            self.update_status(f"Build successful: {os.path.basename(output_sdkk_path)}")
-            self.log_message(f"Build successful: {os.path.basename(output_sdkk_path)}", "info")
+            output_name = os.path.basename(output_sdkk_path)
+            self.update_status(f"Build successful: {output_name}")
+            self.log_message(f"Build successful: {output_name}", "info")
             # Optionally show a success message box
             # messagebox.showinfo("Build Successful", log)
         else:
@@ -894,25 +1354,29 @@ class SDKKBuilderGUI:
              return
 
         sdkk_file = os.path.join(build_dir, f"{package_name}{DEFAULT_OUTPUT_EXTENSION}")
+        sdkk_name = os.path.basename(sdkk_file)
 
         if not os.path.exists(sdkk_file):
-             messagebox.showinfo("Build First", f"Output SDKK file '{os.path.basename(sdkk_file)}' not found.\nPlease build the project successfully first.")
+             messagebox.showinfo("Build First", f"Output SDKK file '{sdkk_name}' not found.\nPlease build the project successfully first.")
              self.update_status("Deployment cancelled (output file not found).")
-             self.log_message(f"Deploy cancelled: Output SDKK file '{os.path.basename(sdkk_file)}' not found. Build first.", "warning")
+             self.log_message(f"Deploy cancelled: Output SDKK file '{sdkk_name}' not found. Build first.", "warning")
              return
-        if not os.path.exists(kernel_elf_path):
+        if not self._path_check(os.path.exists, kernel_elf_path):
              messagebox.showerror("Deploy Error", f"Kernel ELF Path not found: '{kernel_elf_path}'")
              self.update_status("Deployment cancelled (Kernel ELF path invalid).")
              self.log_message(f"Deploy cancelled: Kernel ELF Path not found: '{kernel_elf_path}'", "error")
              return
-        if not os.path.isdir(build_dir):
+        if not self._path_check(os.path.isdir, build_dir):
              messagebox.showerror("Deploy Error", f"Build Directory not found or is not a directory: '{build_dir}'")
              self.update_status("Deployment cancelled (Build Directory invalid).")
              self.log_message(f"Deploy cancelled: Build Directory not found or is not a directory: '{build_dir}'", "error")
              return
 
-        self.update_status(f"Starting deployment for '{os.path.basename(sdkk_file)}'...")
-        self.log_message(f"Starting deployment for '{os.path.basename(sdkk_file)}'...")
+        self.update_status(f"Starting deployment for '{sdkk_name}'...")
+        self.log_message(f"Starting deployment for '{sdkk_name}'...")
+
+        # Import before starting the thread (once; later calls hit sys.modules)
+        from deploy_to_qemu import deploy_to_qemu
 
         # Run deploy in a separate thread
         def run_deploy_in_thread():
@@ -923,10 +1387,10 @@ class SDKKBuilderGUI:
                                           build_dir=build_dir,
                                           app_subdir=app_subdir,
                                           progress_callback=self.log_message) # Use log_message for detailed output
-            # Use root.after to call the result handler in the main GUI thread
-            self.root.after(0, self._handle_deploy_result, success, log)
+            # Call the result handler in the main GUI thread
+            self._call_in_main_thread(self._handle_deploy_result, success, log)
 
-        threading.Thread(target=run_deploy_in_thread, daemon=True).start()
+        self._submit_job(run_deploy_in_thread)
 
     def _handle_deploy_result(self, success: bool, log: str):
         """Handles the result of the deployment process in the main GUI thread."""
@@ -1,7 +1,32 @@
 ﻿# syntax_highlighter.py
 import re
+from bisect import bisect_right
 import tkinter as tk
 
+# Pattern for keywords (more comprehensive list)
+# The lookahead rejects positions that cannot start a keyword before the alternation is tried
+KEYWORDS = r'\b(?=[_a-z])(?:auto|break|case|char|const|continue|default|do|double|else|enum|extern|float|for|goto|if|inline|int|long|register|restrict|return|short|signed|sizeof|static|struct|switch|typedef|union|unsigned|void|volatile|while|_Alignas|_Alignof|_Atomic|_Bool|_Complex|_Generic|_Imaginary|_Noreturn|_Static_assert|_Thread_local)\b'
+# Pattern for strings (handles escaped quotes and escaped newlines)
+STRINGS = r'"(?:[^"\\]|\\[\s\S])*"'
+# Pattern for comments (single-line // and multi-line /* */)
+# The multi-line form is the unrolled /* ... */ loop: runs of non-'*' characters
+# and '*'s not followed by '/', so it needs neither re.DOTALL nor a lazy .*?
+COMMENTS = r'//[^\n]*|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/'
+# Pattern for preprocessor directives (#include, #define, etc.)
+# re.MULTILINE allows ^ to match start of line
+PREPROCESSOR = r'^[ \t]*#[ \t]*\w+[^\n]*' # Matches lines starting with # followed by word
+
+# Combine patterns using |
+# Order matters: comments, strings, and preprocessor should be checked before keywords
+# to avoid highlighting keywords inside them.
+# Each alternative is a group named after its tag, so match.lastgroup is the tag.
+_PATTERN = re.compile(f'(?P<comment>{COMMENTS})|(?P<string>{STRINGS})|(?P<preprocessor>{PREPROCESSOR})|(?P<keyword>{KEYWORDS})',
+                      re.MULTILINE)
+_NEWLINE_RE = re.compile(r'\n')
+
+HIGHLIGHT_TAGS = ("keyword", "string", "comment", "preprocessor") # Add other tags here
+
+
 class CSyntaxHighlighter:
     """
     Provides basic C syntax highlighting for a Tkinter Text widget.
@@ -18,8 +43,9 @@ class CSyntaxHighlighter:
         # but rely on the external trigger for full updates (like paste, load).
         # self.text.bind("<KeyRelease>", self.highlight) # Removed direct binding, relying on GUI class
 
-        # Store the last text content to avoid unnecessary re-highlighting
-        self._last_text = ""
+        # (length, hash) of the last highlighted text, to avoid unnecessary re-highlighting
+        # without keeping a second copy of the buffer
+        self._last_sig = None
 
     def configure_tags(self):
         """Configures the text tags for different syntax elements."""
@@ -32,175 +58,83 @@ class CSyntaxHighlighter:
         # self.text.tag_configure("type", foreground="#00B0F0") # Blue for int, char, struct etc.
 
 
-    def highlight(self, event=None):
+    def highlight(self, event=None, text_content: str = None):
         """
         Applies syntax highlighting to the entire text content.
         Optimized to only re-highlight if the text has changed.
+        text_content may be passed in (without Tk's trailing newline) to avoid another get.
         """
-        # Get content including the potential extra newline from END index
-        text_content = self.text.get("1.0", tk.END)
-        # Remove the extra newline that text.get(..., END) adds for comparison
-        if text_content.endswith('\n'):
-            text_content_compare = text_content[:-1]
-        else:
-            text_content_compare = text_content
+        if text_content is None:
+            text_content = self.text.get("1.0", "end-1c")
 
         # Avoid re-highlighting if text hasn't changed (optimization)
-        if text_content_compare == self._last_text:
+        signature = (len(text_content), hash(text_content))
+        if signature == self._last_sig:
             return
-        self._last_text = text_content_compare # Update last text *before* highlighting
+        self._last_sig = signature # Update last signature *before* highlighting
 
         # Remove all existing tags first
-        for tag in ["keyword", "string", "comment", "preprocessor"]: # Add other tags here
+        for tag in HIGHLIGHT_TAGS:
             self.text.tag_remove(tag, "1.0", tk.END)
 
+        self._apply_tags(text_content, "1.0")
+
+    def highlight_range(self, start: str, end: str):
+        """
+        Re-applies highlighting to the lines spanning start..end only.
+        Falls back to a full highlight if the span touches a block comment,
+        since opening or closing one can change tags outside the span.
+        """
+        start = self.text.index(f"{start} linestart")
+        end = self.text.index(f"{end} lineend")
+        span = self.text.get(start, end)
+
+        if "/*" in span or "*/" in span or self._touches_block_comment(start, end):
+            self._last_sig = None # Force the full pass
+            self.highlight()
+            return
+
+        for tag in HIGHLIGHT_TAGS:
+            self.text.tag_remove(tag, start, end)
+        self._apply_tags(span, start)
+        # Tags are current, but highlight() must not trust its cached signature any more
+        self._last_sig = None
+
+    def _touches_block_comment(self, start: str, end: str) -> bool:
+        """
+        Returns True if a comment tag range runs past either end of start..end.
+        Line comments end within their line, so only a block comment can; its text
+        is not checked, since the edit may have just deleted the "/*" itself.
+        """
+        # A range starting before start (tag_prevrange looks for ranges that begin
+        # before the given index) that still covers the first character
+        first_range = self.text.tag_prevrange("comment", f"{start} + 1c")
+        if (first_range and self.text.compare(first_range[0], "<", start)
+                and self.text.compare(first_range[1], ">", start)):
+            return True
+        # Tag ranges never overlap, so only the last one beginning before end can run past it
+        last_range = self.text.tag_prevrange("comment", end)
+        return bool(last_range) and self.text.compare(last_range[1], ">", end)
+
+    def _apply_tags(self, text_content: str, base_index: str):
+        """Tags every match in text_content, which starts at base_index in the widget."""
+        # Collect start/end index pairs per tag, then add each tag with a single
+        # tag_add call (it takes any number of pairs) instead of one Tk call per match
+        ranges = {tag: [] for tag in HIGHLIGHT_TAGS}
+        # Offsets of the line starts in text_content, so match offsets can be turned
+        # into "line.column" indices here instead of Tk counting "+ Nc" from base_index
+        base_line, base_column = map(int, base_index.split("."))
+        line_starts = [0] + [m.end() for m in _NEWLINE_RE.finditer(text_content)]
+        def to_index(offset):
+            line = bisect_right(line_starts, offset) - 1
+            column = offset - line_starts[line]
+            if line == 0:
+                column += base_column
+            return f"{base_line + line}.{column}"
+
         # Use re.finditer for more efficient searching of multiple matches
-        # Pattern for keywords (more comprehensive list)
-        keywords = r'\b(auto|break|case|char|const|continue|default|do|double|else|enum|extern|float|for|goto|if|inline|int|long|register|restrict|return|short|signed|sizeof|static|struct|switch|typedef|union|unsigned|void|volatile|while|_Alignas|_Alignof|_Atomic|_Bool|_Complex|_Generic|_Imaginary|_Noreturn|_Static_assert|_Thread_local)\b'
-        # Pattern for strings (handles escaped quotes)
-        strings = r'"(?:[^"\\]|\\.)*"'
-        # Pattern for comments (single-line // and multi-line /* */)
-        # Use non-greedy match for multi-line comments (.*?)
-        # re.DOTALL allows . to match newlines
-        comments = r'//.*|/\*.*?\*/'
-        # Pattern for preprocessor directives (#include, #define, etc.)
-        # re.MULTILINE allows ^ to match start of line
-        preprocessor = r'^\s*#\s*\w+.*' # Matches lines starting with # followed by word
-
-        # Combine patterns using |
-        # Order matters: comments, strings, and preprocessor should be checked before keywords
-        # to avoid highlighting keywords inside them.
-        pattern = re.compile(f'({comments}|{strings}|{preprocessor}|{keywords})', re.DOTALL | re.MULTILINE)
-
-        for match in pattern.finditer(text_content):
-            start_index = match.start()
-            end_index = match.end()
-            tag = None
-
-            # Determine which pattern matched
-            match_text = match.group(0)
-
-            # Check for comments first (both types)
-            if match_text.startswith('//') or match_text.startswith('/*'):
-                tag = "comment"
-            # Check for strings
-            elif match_text.startswith('"'):
-                tag = "string"
-            # Check for preprocessor directives (must be at start of line after optional whitespace)
-            # Use match.group(0).strip() to check the start of the matched text after stripping whitespace
-            elif match_text.strip().startswith('#'):
-                 tag = "preprocessor"
-            # Check for keywords (must be a full word match)
-            # Use re.fullmatch to ensure the *entire* matched text is a keyword
-            elif re.fullmatch(keywords, match_text):
-                 tag = "keyword"
-
-            if tag:
-                # Convert character index to Text widget index (line.column)
-                # Text widget indices are 1-based for line, 0-based for column
-                start_tk_index = self.text.index(f"1.0 + {start_index}c")
-                end_tk_index = self.text.index(f"1.0 + {end_index}c")
-                self.text.tag_add(tag, start_tk_index, end_tk_index)
-# syntax_highlighter.py (No changes needed from previous version)
-# import re
-# import tkinter as tk
-
-# class CSyntaxHighlighter:
-#     """
-#     Provides basic C syntax highlighting for a Tkinter Text widget.
-#     Highlights keywords, strings, comments, and preprocessor directives.
-#     """
-#     def __init__(self, text_widget: tk.Text):
-#         """Initializes the highlighter for the given Text widget."""
-#         self.text = text_widget
-#         self.configure_tags()
-
-#         # Bind the highlight method to text modification events
-#         # The GUI class will trigger highlight via _on_editor_change
-#         # We keep a KeyRelease binding for responsiveness during typing,
-#         # but rely on the external trigger for full updates (like paste, load).
-#         # self.text.bind("<KeyRelease>", self.highlight) # Removed direct binding, relying on GUI class
-
-#         # Store the last text content to avoid unnecessary re-highlighting
-#         self._last_text = ""
-
-#     def configure_tags(self):
-#         """Configures the text tags for different syntax elements."""
-#         self.text.tag_configure("keyword", foreground="#FF6A00") # Orange
-#         self.text.tag_configure("string", foreground="#A5C25C")  # Green
-#         self.text.tag_configure("comment", foreground="#808080") # Gray
-#         self.text.tag_configure("preprocessor", foreground="#999999") # Light gray for #include etc.
-#         # Add more tags if needed, e.g., for numbers, function names, etc.
-#         # self.text.tag_configure("number", foreground="#00B0F0") # Blue
-#         # self.text.tag_configure("type", foreground="#00B0F0") # Blue for int, char, struct etc.
-
-
-#     def highlight(self, event=None):
-#         """
-#         Applies syntax highlighting to the entire text content.
-#         Optimized to only re-highlight if the text has changed.
-#         """
-#         # Get content including the potential extra newline from END index
-#         text_content = self.text.get("1.0", tk.END)
-#         # Remove the extra newline that text.get(..., END) adds for comparison
-#         if text_content.endswith('\n'):
-#             text_content_compare = text_content[:-1]
-#         else:
-#             text_content_compare = text_content
-
-#         # Avoid re-highlighting if text hasn't changed (optimization)
-#         if text_content_compare == self._last_text:
-#             return
-#         self._last_text = text_content_compare # Update last text *before* highlighting
-
-#         # Remove all existing tags first
-#         for tag in ["keyword", "string", "comment", "preprocessor"]: # Add other tags here
-#             self.text.tag_remove(tag, "1.0", tk.END)
-
-#         # Use re.finditer for more efficient searching of multiple matches
-#         # Pattern for keywords (more comprehensive list)
-#         keywords = r'\b(auto|break|case|char|const|continue|default|do|double|else|enum|extern|float|for|goto|if|inline|int|long|register|restrict|return|short|signed|sizeof|static|struct|switch|typedef|union|unsigned|void|volatile|while|_Alignas|_Alignof|_Atomic|_Bool|_Complex|_Generic|_Imaginary|_Noreturn|_Static_assert|_Thread_local)\b'
-#         # Pattern for strings (handles escaped quotes)
-#         strings = r'"(?:[^"\\]|\\.)*"'
-#         # Pattern for comments (single-line // and multi-line /* */)
-#         # Use non-greedy match for multi-line comments (.*?)
-#         # re.DOTALL allows . to match newlines
-#         comments = r'//.*|/\*.*?\*/'
-#         # Pattern for preprocessor directives (#include, #define, etc.)
-#         # re.MULTILINE allows ^ to match start of line
-#         preprocessor = r'^\s*#\s*\w+.*' # Matches lines starting with # followed by word
-
-#         # Combine patterns using |
-#         # Order matters: comments, strings, and preprocessor should be checked before keywords
-#         # to avoid highlighting keywords inside them.
-#         pattern = re.compile(f'({comments}|{strings}|{preprocessor}|{keywords})', re.DOTALL | re.MULTILINE)
-
-#         for match in pattern.finditer(text_content):
-#             start_index = match.start()
-#             end_index = match.end()
-#             tag = None
-
-#             # Determine which pattern matched
-#             match_text = match.group(0)
-
-#             # Check for comments first (both types)
-#             if match_text.startswith('//') or match_text.startswith('/*'):
-#                 tag = "comment"
-#             # Check for strings
-#             elif match_text.startswith('"'):
-#                 tag = "string"
-#             # Check for preprocessor directives (must be at start of line after optional whitespace)
-#             # Use match.group(0).strip() to check the start of the matched text after stripping whitespace
-#             elif match_text.strip().startswith('#'):
-#                  tag = "preprocessor"
-#             # Check for keywords (must be a full word match)
-#             # Use re.fullmatch to ensure the *entire* matched text is a keyword
-#             elif re.fullmatch(keywords, match_text):
-#                  tag = "keyword"
-
-#             if tag:
-#                 # Convert character index to Text widget index (line.column)
-#                 # Text widget indices are 1-based for line, 0-based for column
-#                 start_tk_index = self.text.index(f"1.0 + {start_index}c")
-#                 end_tk_index = self.text.index(f"1.0 + {end_index}c")
-#                 self.text.tag_add(tag, start_tk_index, end_tk_index)
+        for match in _PATTERN.finditer(text_content):
+            ranges[match.lastgroup] += (to_index(match.start()), to_index(match.end()))
+        for tag, indices in ranges.items():
+            if indices:
+                self.text.tag_add(tag, *indices)